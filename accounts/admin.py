@@ -1,8 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, UserProfile, ProfileType, Permission
+from manipalapp.paginator import EstimatedCountPaginator
+from .models import User, UserProfile, ProfileType, Permission, OtpVerification
+from . import search
 
 class UserAdmin(BaseUserAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # would be a second exact COUNT(*) on every filtered page
     ordering = ['email']
     list_display = ['email', 'phone_number', 'is_staff', 'is_active']
     search_fields = ['email', 'phone_number']
@@ -19,12 +23,53 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Same indexed lookup as /accounts/search/ rather than ILIKE '%term%' on every row
+        term = search_term.strip()
+        if len(term) < search.MIN_QUERY_LENGTH:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=search.matching_ids(term)), False
+
+class UserProfileAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_display = ["user", "first_name", "last_name", "profile_type", "created_at"]
+    list_select_related = ["user", "profile_type"]  # __str__ and the columns above read both
+    list_filter = ["profile_type"]
+    search_fields = ["first_name", "last_name"]
+    raw_id_fields = ["user"]  # a select with every user would not render
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if len(term) < search.MIN_QUERY_LENGTH:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(user_id__in=search.matching_ids(term)), False
+
 class ProfileTypeAdmin(admin.ModelAdmin):
-    list_display = ["type"]
+    list_display = ["type", "updated_at"]
+    ordering = ["type"]
     search_fields = ["type"]
     filter_horizontal = ("permissions",) 
 
+class OtpVerificationAdmin(admin.ModelAdmin):
+    # Read-only audit view. Filters and ordering stick to indexed columns, search is an exact
+    # identifier match so it can use the identifier index.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_display = ["identifier", "channel", "attempts", "is_used", "expires_at", "created_at"]
+    list_filter = [("expires_at", admin.DateFieldListFilter)]
+    search_fields = ["=identifier"]
+    ordering = ["-expires_at"]
+    exclude = ["code_hash", "salt"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 admin.site.register(User, UserAdmin)
-admin.site.register(UserProfile)
+admin.site.register(UserProfile, UserProfileAdmin)
 admin.site.register(ProfileType, ProfileTypeAdmin)
 admin.site.register(Permission)
+admin.site.register(OtpVerification, OtpVerificationAdmin)
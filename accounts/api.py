@@ -1,30 +1,67 @@
 # accounts/api.py
+from typing import Literal, Optional
+
+from asgiref.sync import sync_to_async
 from ninja import Router
+from ninja.constants import NOT_SET
+from ninja.errors import HttpError
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.conf import settings
-from django.http import HttpResponseRedirect, HttpRequest
+from django.http import HttpResponse, HttpResponseRedirect, HttpRequest, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
 import requests as http_requests
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from accounts.constants import ROLES, PERMISSIONS
-from manipalapp.jwt import JWTAuth
-from .schema import UserCreate, UserOut, UserPatch, GoogleAuthRequest, GoogleAuthResponse, RequestOtpIn, VerifyOtpIn, TokenOut, CompleteProfileIn
+from manipalapp.db_router import read_replica
+from manipalapp.jwt import AsyncJWTAuth, JWTAuth
+from manipalapp.serialization import construct, ndjson_lines, rows_response
+from .schema import UserCreate, UserOut, UserPageOut, UserPatch, UserBulkPatchIn, UserBulkPatchOut, UserSearchOut, LeaderboardOut, GoogleAuthRequest, GoogleAuthResponse, RequestOtpIn, VerifyOtpIn, TokenOut, CompleteProfileIn
 from .models import AuthProvider, UserProfile, ProfileType
-from accounts import decorators
+from accounts import decorators, google_oauth, search, user_cache
+from accounts.utils import encode_cursor, decode_cursor, encode_search_cursor, decode_search_cursor
+from accounts.tokens import PermissionClaimsRefreshToken
 from service.otpservice.service import OtpService
 from service.otpservice.sender import ConsoleSender
+from service.otpservice.dispatcher import QueuedOtpDispatcher
+from service.pointsservice.leaderboard import leaderboard
 
 app = Router(tags=["accounts"], auth=JWTAuth())
 
 sender = ConsoleSender() # swap with real sender in production
+if settings.OTP_DELIVERY_SETTINGS["ASYNC"]:
+    # Deliver from background workers instead of the request thread
+    sender = QueuedOtpDispatcher.from_settings({"sms": sender, "email": sender}, settings.OTP_DELIVERY_SETTINGS)
 svc = OtpService(sender)
 User = get_user_model()
 
+USER_PATCH_FIELDS = ['email', 'phone_number']
+PROFILE_PATCH_FIELDS = ['bio', 'first_name', 'last_name', 'date_of_birth', 'gender']
+BULK_PATCH_CHUNK_SIZE = 500
+USERS_PAGE_MAX_LIMIT = 500
+USERS_EXPORT_CHUNK_SIZE = 2000
+SEARCH_PAGE_MAX_LIMIT = 100
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_MAX_RADIUS = 25
+
+
+def _register(method, path, sync_view, async_view, **kwargs):
+    """
+    Route `path` to async_view when serving over ASGI (settings.ASGI_MODE) and to sync_view
+    otherwise. Authenticated async views get AsyncJWTAuth instead of the router's JWTAuth.
+    """
+    view = sync_view
+    if settings.ASGI_MODE:
+        view = async_view
+        if kwargs.get("auth", NOT_SET) is NOT_SET:
+            kwargs["auth"] = AsyncJWTAuth()
+    getattr(app, method)(path, **kwargs)(view)
+
 
 @app.post("/register/", response=UserOut, auth=None)
 def register_user(request, data: UserCreate):
@@ -65,48 +102,171 @@ def register_user(request, data: UserCreate):
         phone_number=data.phone_number,
         date_of_birth=data.date_of_birth 
     )
-    return UserOut.model_validate(user)
+    return construct(UserOut, user)
+
 
+@app.get("/users/", response=UserPageOut)
+@decorators.permission_required(PERMISSIONS.CAN_VIEW_USER)
+@read_replica
+def list_users(
+    request,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    is_email_verified: Optional[bool] = None,
+    auth_provider: Optional[AuthProvider] = None,
+    format: Literal["json", "ndjson"] = "json",
+):
+    """
+    List users, ordered by id and paginated with a keyset cursor.
 
-@app.get("/users/", response=list[UserOut])
+    Args:
+        request: The HTTP request object
+        limit (int): Page size, at most USERS_PAGE_MAX_LIMIT
+        cursor (str, optional): The `next` value of the previous page
+        is_email_verified (bool, optional): Filter on email verification
+        auth_provider (str, optional): Filter on "phone" or "google"
+        format (str): "json" for one page, "ndjson" to stream every user
+            from the cursor on, one JSON object per line, in constant memory
+
+    Returns:
+        UserPageOut: Page of users and the cursor of the next page
+
+    Permission:
+        Requires ADMIN role
+    """
+    users = User.objects.order_by("id")
+    if cursor:
+        try:
+            users = users.filter(id__gt=decode_cursor(cursor))
+        except ValueError as e:
+            raise HttpError(400, str(e))
+    if is_email_verified is not None:
+        users = users.filter(is_email_verified=is_email_verified)
+    if auth_provider is not None:
+        users = users.filter(auth_provider=auth_provider)
+    # Rows are written straight from tuples, UserPageOut only documents the shape
+    fields = ("id", "email")
+    users = users.values_list(*fields)
+
+    if format == "ndjson":
+        # The rows are read while the response streams, after read_replica has returned:
+        # pick the database now
+        rows = users.using(router.db_for_read(User)).iterator(chunk_size=USERS_EXPORT_CHUNK_SIZE)
+        return StreamingHttpResponse(ndjson_lines(fields, rows), content_type="application/x-ndjson")
+
+    limit = max(1, min(limit, USERS_PAGE_MAX_LIMIT))
+    page = list(users[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1][0]) if len(page) > limit else None
+    return rows_response(fields, page[:limit], next=next_cursor)
+
+
+@app.get("/search/", response=UserSearchOut)
 @decorators.permission_required(PERMISSIONS.CAN_VIEW_USER)
-def list_users(request):
+@read_replica
+def search_users(request, q: str, limit: int = 20, cursor: Optional[str] = None):
     """
-    List all users in the system.
+    Search users by email, phone number or name, best matches first.
 
     Args:
         request: The HTTP request object
+        q (str): Search term, at least search.MIN_QUERY_LENGTH characters
+        limit (int): Page size, at most SEARCH_PAGE_MAX_LIMIT
+        cursor (str, optional): The `next` value of the previous page
 
     Returns:
-        list[UserOut]: List of all users with basic information
+        UserSearchOut: Ranked matches and the cursor of the next page
 
     Permission:
         Requires ADMIN role
     """
-    return list(User.objects.values("id", "email"))
+    q = q.strip()
+    if len(q) < search.MIN_QUERY_LENGTH:
+        raise HttpError(400, f"Search term must be at least {search.MIN_QUERY_LENGTH} characters")
+    after = None
+    if cursor:
+        try:
+            after = decode_search_cursor(cursor)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+
+    limit = max(1, min(limit, SEARCH_PAGE_MAX_LIMIT))
+    rows = search.find_users(q, limit + 1, after)
+    items = [
+        {
+            "id": row["id"],
+            "email": row["email"],
+            "phone_number": row["phone_number"],
+            "full_name": (f"{row['profile__first_name']} {row['profile__last_name']}"
+                          if row["profile__first_name"] is not None else None),
+            "rank": row["rank"],
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = encode_search_cursor(rows[limit - 1]["rank"], rows[limit - 1]["id"]) if len(rows) > limit else None
+    return {"items": items, "next": next_cursor}
 
 
-@app.get("/user/", response=UserOut)
 @decorators.permission_required(PERMISSIONS.CAN_VIEW_USER)
+@read_replica
 def get_user(request):
     """
-    Retrieve detailed information about a specific user.
+    Retrieve the authenticated user's information.
+
+    Supports conditional requests: the response carries an ETag and Last-Modified built
+    from the user's and profile's updated_at, and a matching If-None-Match or
+    If-Modified-Since gets a 304 without serializing anything. Serialized bodies are
+    cached in Redis per user and dropped whenever the user or profile is saved.
 
     Args:
         request: The HTTP request object
-        user_id (int): The ID of the user to retrieve
 
     Returns:
         UserOut: User details
 
-    Raises:
-        Http404: If user with specified ID doesn't exist
-
     Permission:
         Requires USER or ADMIN role
     """
-    print("user value",request.user)
-    return UserOut.model_validate(get_object_or_404(User, email=request.user.email))
+    # Already loaded (and cached) by JWTAuth, no need to query it again
+    user = request.user
+    etag, last_modified, response = _user_not_modified(request, user)
+    if response is None:
+        body = user_cache.get_serialized(user, etag, _serialize_user)
+        response = HttpResponse(body, content_type="application/json")
+    return _with_user_validators(response, etag, last_modified)
+
+
+@decorators.permission_required(PERMISSIONS.CAN_VIEW_USER)
+@read_replica
+async def aget_user(request):
+    """get_user for ASGI mode, the cached body is read over redis.asyncio."""
+    user = request.user
+    etag, last_modified, response = _user_not_modified(request, user)
+    if response is None:
+        body = await user_cache.aget_serialized(user, etag, _serialize_user)
+        response = HttpResponse(body, content_type="application/json")
+    return _with_user_validators(response, etag, last_modified)
+
+
+_register("get", "/user/", get_user, aget_user, response=UserOut)
+
+
+def _serialize_user(user):
+    return construct(UserOut, user).model_dump_json()
+
+
+def _user_not_modified(request, user):
+    """The user's validators and a 304 response when the client's copy is current, else None."""
+    etag, last_modified = user_cache.user_validators(user)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    return etag, last_modified, not_modified
+
+
+def _with_user_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified.timestamp())
+    # Clients must revalidate, the body is per user
+    response["Cache-Control"] = "private, no-cache"
+    return response
 
 
 @app.patch("/user/", response=UserOut)
@@ -133,32 +293,114 @@ def patch_user(request, data: UserPatch):
     Permission:
         Requires USER or ADMIN role
     """
-    user = request.user
-    user_fields = ['email', 'phone_number']
-    profile_fields = ['bio', 'first_name', 'last_name', 'date_of_birth', 'gender']
-    
-    # Update user fields
-    for field in user_fields:
-        value = getattr(data, field, None)
-        if value is not None:
-            setattr(user, field, value)
-    
-    # Handle password separately since it needs special treatment
-    if data.password is not None:
-        user.set_password(data.password)
-    
-    user.save()
+    with transaction.atomic():
+        # request.user comes from the user cache and may be stale in this worker: diff against
+        # the row itself, locked so concurrent patches apply one after the other
+        user = get_object_or_404(
+            User.objects.select_for_update(of=("self",)).select_related("profile"), pk=request.user.pk,
+        )
+
+        # Only columns whose value actually changes are written
+        user_changes = _apply_changes(user, data, USER_PATCH_FIELDS)
 
-    # Update profile fields
-    if hasattr(user, "profile"):
-        profile = user.profile
-        for field in profile_fields:
-            value = getattr(data, field, None)
-            if value is not None:
-                setattr(profile, field, value)
-        profile.save()
+        # Handle password separately since it needs special treatment
+        if data.password is not None:
+            user.set_password(data.password)
+            user_changes.append("password")
 
-    return UserOut.model_validate(user)
+        profile = getattr(user, "profile", None)
+        profile_changes = _apply_changes(profile, data, PROFILE_PATCH_FIELDS) if profile is not None else []
+
+        # updated_at is auto_now, it only moves when listed in update_fields
+        if user_changes:
+            user.save(update_fields=user_changes + ["updated_at"])
+        if profile_changes:
+            profile.save(update_fields=profile_changes + ["updated_at"])
+
+    return construct(UserOut, user)
+
+
+@app.patch("/users/bulk/", response=UserBulkPatchOut)
+@decorators.permission_required(PERMISSIONS.CAN_BULK_UPDATE_USER)
+def bulk_patch_users(request, data: UserBulkPatchIn):
+    """
+    Apply many user/profile corrections at once (back office).
+    Only provided fields are updated; users are written with bulk_update in chunks of
+    BULK_PATCH_CHUNK_SIZE, all in one transaction.
+
+    Args:
+        request: The HTTP request object
+        data (UserBulkPatchIn): items, each with the user `id` and the fields to change
+
+    Returns:
+        UserBulkPatchOut: Number of users and profiles changed, ids that weren't found
+
+    Raises:
+        HttpError 409: If a change breaks a unique constraint (email, phone number);
+            nothing is applied in that case
+
+    Permission:
+        Requires ADMIN role
+    """
+    items = {item.id: item for item in data.items}
+    ids = list(items)
+    missing, changed_user_ids = [], []
+    updated_users = updated_profiles = 0
+
+    try:
+        with transaction.atomic():
+            for start in range(0, len(ids), BULK_PATCH_CHUNK_SIZE):
+                chunk = ids[start:start + BULK_PATCH_CHUNK_SIZE]
+                users = User.objects.select_related("profile").in_bulk(chunk)
+                now = timezone.now()
+                changed_users, user_fields = [], set()
+                changed_profiles, profile_fields = [], set()
+
+                for user_id in chunk:
+                    user = users.get(user_id)
+                    if user is None:
+                        missing.append(user_id)
+                        continue
+                    user_changes = _apply_changes(user, items[user_id], USER_PATCH_FIELDS)
+                    if user_changes:
+                        user.updated_at = now
+                        changed_users.append(user)
+                        user_fields.update(user_changes)
+
+                    profile = getattr(user, "profile", None)
+                    profile_changes = _apply_changes(profile, items[user_id], PROFILE_PATCH_FIELDS) if profile else []
+                    if profile_changes:
+                        profile.updated_at = now
+                        changed_profiles.append(profile)
+                        profile_fields.update(profile_changes)
+
+                    if user_changes or profile_changes:
+                        changed_user_ids.append(user_id)
+
+                # bulk_update neither applies auto_now nor sends signals, both are handled here
+                if changed_users:
+                    User.objects.bulk_update(changed_users, sorted(user_fields) + ["updated_at"])
+                if changed_profiles:
+                    UserProfile.objects.bulk_update(changed_profiles, sorted(profile_fields) + ["updated_at"])
+                updated_users += len(changed_users)
+                updated_profiles += len(changed_profiles)
+
+            transaction.on_commit(lambda: user_cache.invalidate_users(changed_user_ids))
+    except IntegrityError:
+        raise HttpError(409, "Bulk update rejected: an email or phone number is already in use")
+
+    return {"updated_users": updated_users, "updated_profiles": updated_profiles, "missing": missing}
+
+
+def _apply_changes(instance, data, fields) -> list:
+    """Copy the provided (non-None) values from `data` onto `instance`; return the fields that changed."""
+    changed = []
+    for field in fields:
+        value = getattr(data, field, None)
+        if value is not None and getattr(instance, field) != value:
+            setattr(instance, field, value)
+            changed.append(field)
+    return changed
 
 
 @app.delete("/user/")
@@ -176,12 +418,61 @@ def delete_user(request):
     Permission:
         Requires USER or ADMIN role
     """
-    user = request.user
+    # A fresh row and only the deletion columns: the cached request.user may be stale and a
+    # full save would write its old email or password back
+    user = get_object_or_404(User, pk=request.user.pk)
     user.is_deleted = True
-    user.save()
+    user.save(update_fields=["is_deleted", "deleted_at", "updated_at"])
     return {"success": True, "message": "User deleted successfully"}
 
 
+@app.get("/leaderboard/", response=LeaderboardOut)
+def leaderboard_top(request, limit: int = 10, profile_type_id: Optional[int] = None):
+    """
+    Top users by points, overall or within one profile type.
+
+    Args:
+        request: The HTTP request object
+        limit (int): Number of users, at most LEADERBOARD_MAX_LIMIT
+        profile_type_id (int, optional): Rank within this profile type only
+
+    Returns:
+        LeaderboardOut: Ranked users, best first
+    """
+    limit = max(1, min(limit, LEADERBOARD_MAX_LIMIT))
+    return {"items": _leaderboard_entries(leaderboard.top(limit, profile_type_id))}
+
+
+@app.get("/leaderboard/me/", response=LeaderboardOut)
+def leaderboard_around_me(request, radius: int = 5, profile_type_id: Optional[int] = None):
+    """
+    The authenticated user's rank with the users just above and below.
+
+    Args:
+        request: The HTTP request object
+        radius (int): Neighbours on each side, at most LEADERBOARD_MAX_RADIUS
+        profile_type_id (int, optional): Rank within this profile type only
+
+    Returns:
+        LeaderboardOut: Ranked users, best first; empty when the user has no points yet
+    """
+    radius = max(0, min(radius, LEADERBOARD_MAX_RADIUS))
+    return {"items": _leaderboard_entries(leaderboard.around(request.user.id, radius, profile_type_id))}
+
+
+def _leaderboard_entries(rows) -> list:
+    names = {
+        user_id: f"{first_name} {last_name}"
+        for user_id, first_name, last_name in UserProfile.objects
+            .filter(user_id__in=[user_id for _, user_id, _ in rows])
+            .values_list("user_id", "first_name", "last_name")
+    }
+    return [
+        {"rank": rank, "user_id": user_id, "points": points, "full_name": names.get(user_id)}
+        for rank, user_id, points in rows
+    ]
+
+
 @app.get("/google/login/", auth=None)
 def google_login(request):
     """
@@ -200,7 +491,6 @@ def google_login(request):
     return HttpResponseRedirect(auth_url)
 
 
-@app.get("/google/callback/", response=GoogleAuthResponse, auth=None)
 def google_callback(request, code: str = None, error: str = None):
     """
     Handles the Google OAuth2 callback and creates/authenticates the user.
@@ -211,57 +501,80 @@ def google_callback(request, code: str = None, error: str = None):
     if not code:
         return {"error": "Authorization code is missing"}
 
-    # Exchange code for tokens
-    token_url = "https://oauth2.googleapis.com/token"
-    token_data = {
-        "code": code,
-        "client_id": settings.GOOGLE_OAUTH2_CLIENT_ID,
-        "client_secret": settings.GOOGLE_OAUTH2_CLIENT_SECRET,
-        "redirect_uri": settings.GOOGLE_OAUTH2_REDIRECT_URI,
-        "grant_type": "authorization_code",
-    }
+    id_info, error = _google_identity(code)
+    if error:
+        return {"error": error}
 
-    response = http_requests.post(token_url, data=token_data)
-    if not response.ok:
-        return {"error": "Failed to get access token"}
+    # Check if email exists and is verified
+    try:
+        user = User.objects.get(email=id_info["email"])
+    except User.DoesNotExist:
+        return {"error": "Please login with phone number first and verify your email"}
+    if not user.is_email_verified:
+        return {"error": "Please verify your email through phone login first"}
 
-    tokens = response.json()
+    # Update auth provider to include Google
+    user.auth_provider = AuthProvider.GOOGLE
+    user.save(update_fields=["auth_provider"])
+    return _google_auth_response(user)
 
-    # Verify ID token
-    try:
-        id_info = id_token.verify_oauth2_token(
-            tokens["id_token"],
-            requests.Request(),
-            settings.GOOGLE_OAUTH2_CLIENT_ID,
-        )
-    except ValueError:
-        return {"error": "Invalid ID token"}
 
-    # Check if email exists and is verified
-    email = id_info["email"]
+async def agoogle_callback(request, code: str = None, error: str = None):
+    """google_callback for ASGI mode: Google calls run in worker threads, the user goes through the async ORM."""
+    if error:
+        return {"error": error}
+
+    if not code:
+        return {"error": "Authorization code is missing"}
+
+    id_info, error = await sync_to_async(_google_identity, thread_sensitive=False)(code)
+    if error:
+        return {"error": error}
+
     try:
-        user = User.objects.get(email=email)
-        if not user.is_email_verified:
-            return {"error": "Please verify your email through phone login first"}
-            
-        # Update auth provider to include Google
-        user.auth_provider = AuthProvider.GOOGLE
-        user.save(update_fields=["auth_provider"])
-        
-        # Generate tokens
-        refresh = RefreshToken.for_user(user)
-        return GoogleAuthResponse(
-            access_token=str(refresh.access_token),
-            refresh_token=str(refresh),
-            user=UserOut.model_validate(user)
-        )
+        user = await User.objects.aget(email=id_info["email"])
     except User.DoesNotExist:
         return {"error": "Please login with phone number first and verify your email"}
+    if not user.is_email_verified:
+        return {"error": "Please verify your email through phone login first"}
+
+    user.auth_provider = AuthProvider.GOOGLE
+    await user.asave(update_fields=["auth_provider"])
+    # Permission claims may read the profile
+    return await sync_to_async(_google_auth_response)(user)
+
+
+_register("get", "/google/callback/", google_callback, agoogle_callback, response=GoogleAuthResponse, auth=None)
+
+
+def _google_identity(code: str):
+    """Exchange the authorization code and verify the ID token: (id_info, None) or (None, error)."""
+    try:
+        tokens = google_oauth.exchange_code(code)
+    except http_requests.RequestException:
+        return None, "Failed to get access token"
+
+    # Verified locally against Google's cached certs
+    try:
+        id_info = google_oauth.verify_id_token(tokens["id_token"])
+    except http_requests.RequestException:
+        return None, "Failed to fetch Google certificates"
+    except (KeyError, ValueError):
+        return None, "Invalid ID token"
+    return id_info, None
+
+
+def _google_auth_response(user):
+    refresh = PermissionClaimsRefreshToken.for_user(user)
+    return GoogleAuthResponse(
+        access_token=str(refresh.access_token),
+        refresh_token=str(refresh),
+        user=construct(UserOut, user)
+    )
 
 # OTP API
 
 
-@app.post("/request-otp", auth=None)
 def request_otp(request: HttpRequest, payload: RequestOtpIn):
     try:
         svc.request_otp(payload.identifier, payload.channel)
@@ -271,23 +584,47 @@ def request_otp(request: HttpRequest, payload: RequestOtpIn):
         return {"ok": False, "error": str(e)}
 
 
-@app.post("/verify-otp", auth=None)
+async def arequest_otp(request: HttpRequest, payload: RequestOtpIn):
+    try:
+        await svc.arequest_otp(payload.identifier, payload.channel)
+        return {"ok": True, "message": "OTP sent"}
+    except ValueError as e:
+        request.status_code = 400
+        return {"ok": False, "error": str(e)}
+
+
+_register("post", "/request-otp", request_otp, arequest_otp, auth=None)
+
+
 def verify_otp(request, payload: VerifyOtpIn):
     try:
-        # Validate if identifier is email
-        try:
-            validate_email(payload.identifier)
-            is_email = True
-        except ValidationError:
-            is_email = False
-            
-        result = svc.verify_otp(payload.identifier, payload.code, is_email_verification=is_email)
+        result = svc.verify_otp(payload.identifier, payload.code, is_email_verification=_is_email(payload.identifier))
         return result
     except ValueError as e:
         request.status_code = 400
         return {"error": str(e)}
 
 
+async def averify_otp(request, payload: VerifyOtpIn):
+    try:
+        return await svc.averify_otp(payload.identifier, payload.code, is_email_verification=_is_email(payload.identifier))
+    except ValueError as e:
+        request.status_code = 400
+        return {"error": str(e)}
+
+
+_register("post", "/verify-otp", verify_otp, averify_otp, auth=None)
+
+
+def _is_email(identifier: str) -> bool:
+    # Validate if identifier is email
+    try:
+        validate_email(identifier)
+        return True
+    except ValidationError:
+        return False
+
+
 @app.post("/complete-profile", response=TokenOut, auth=None)
 def complete_profile(request, payload: CompleteProfileIn):
     try:
@@ -309,7 +646,7 @@ def complete_profile(request, payload: CompleteProfileIn):
         else:
             raise ValueError("erifVication_id is required")
 
-        return tokens
+        return construct(TokenOut, tokens)
     except ValueError as e:
         request.status_code = 400
         return {"error": str(e)}
\ No newline at end of file
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.db.models import Q, UniqueConstraint
+
+
+# Stands in for auth.E003, which settings.SILENCED_SYSTEM_CHECKS turns off. Django wants
+# USERNAME_FIELD unique over the whole table, but a deleted account keeps its row and frees
+# its phone number. Every auth lookup by username goes through the default manager:
+# ModelBackend.authenticate and createsuperuser both call
+# _default_manager.get_by_natural_key. UserManager only sees live users and the partial index
+# makes the phone number unique among them, so a lookup finds at most one user. This check
+# fails if either of those stops being true.
+
+LIVE = Q(is_deleted=False)
+
+
+@checks.register(checks.Tags.models)
+def check_live_username_unique(app_configs, **kwargs):
+    from .models import UserManager
+
+    User = get_user_model()
+    field = User.USERNAME_FIELD
+    errors = []
+    if not any(
+        isinstance(constraint, UniqueConstraint) and constraint.fields == (field,) and constraint.condition == LIVE
+        for constraint in User._meta.constraints
+    ):
+        errors.append(checks.Error(
+            f"'{User._meta.object_name}.{field}' needs a UniqueConstraint with condition {LIVE!r} "
+            "while auth.E003 is silenced.",
+            obj=User,
+            id="accounts.E001",
+        ))
+    if not isinstance(User._default_manager, UserManager):
+        errors.append(checks.Error(
+            f"{User._meta.object_name}'s default manager must be UserManager, which hides deleted "
+            "users from get_by_natural_key, while auth.E003 is silenced.",
+            obj=User,
+            id="accounts.E002",
+        ))
+    return errors
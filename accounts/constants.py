@@ -6,6 +6,7 @@ class ROLES:
 
 
 
+# Bit positions in the JWT permission claim follow this order: only append new codes.
 class PERMISSIONS:
     CAN_VIEW_USER = "can_view_user"
     CAN_UPDATE_USER = "can_update_user"
@@ -15,4 +16,13 @@ class PERMISSIONS:
     CAN_DELETE_DOCTOR = "can_delete_doctor"
     CAN_VIEW_MEDIATOR = "can_view_mediator"
     CAN_UPDATE_MEDIATOR = "can_update_mediator"
-    CAN_DELETE_MEDIATOR = "can_delete_mediator"
\ No newline at end of file
+    CAN_DELETE_MEDIATOR = "can_delete_mediator"
+    CAN_BULK_UPDATE_USER = "can_bulk_update_user"
+
+
+PERMISSION_BITS = {
+    code: 1 << index
+    for index, code in enumerate(
+        value for name, value in vars(PERMISSIONS).items() if name.isupper()
+    )
+}
@@ -1,27 +1,55 @@
 # permissions.py
+import inspect
+import logging
+
+from asgiref.sync import sync_to_async
 from ninja.errors import HttpError
 from functools import wraps
 
+from .constants import PERMISSION_BITS
+from .permission_catalog import permission_catalog
+from .tokens import token_permission_mask
 
-def permission_required(*required_permissions):
-    def decorator(view_func):
-        @wraps(view_func)
-        def wrapper(request, *args, **kwargs):
-            user = request.auth
-            print("user in decorator",user)
+logger = logging.getLogger(__name__)
+
+
+def _authorize(request, required_permissions):
+    user = request.auth
+    logger.debug("authorizing %s for %s", user, required_permissions)
+
+    # Claims mode: authorize from the validated token when its claims are current
+    mask = token_permission_mask(getattr(request, "auth_token", None), user)
+    if mask is not None:
+        for perm in required_permissions:
+            if not mask & PERMISSION_BITS.get(perm, 0):
+                raise HttpError(403, f"Permission '{perm}' is required")
+        return
 
-            if not hasattr(user, 'profile') or not user.profile.profile_type:
-                raise HttpError(403, "No profile or role associated with user")
+    profile = getattr(user, "profile", None)
+    if profile is None or not profile.profile_type_id:
+        raise HttpError(403, "No profile or role associated with user")
 
-            profile_type = user.profile.profile_type
-            user_permissions = set(profile_type.permissions.values_list("code", flat=True))
+    # Compiled per ProfileType and cached, no queries on the hot path
+    user_permissions = permission_catalog.get_permissions(profile.profile_type_id)
 
-            for perm in required_permissions:
-                if perm not in user_permissions:
-                    raise HttpError(403, f"Permission '{perm}' is required")
+    for perm in required_permissions:
+        if perm not in user_permissions:
+            raise HttpError(403, f"Permission '{perm}' is required")
 
+
+def permission_required(*required_permissions):
+    def decorator(view_func):
+        if inspect.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # A permission catalog miss reads Redis and the database
+                await sync_to_async(_authorize)(request, required_permissions)
+                return await view_func(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            _authorize(request, required_permissions)
             return view_func(request, *args, **kwargs)
         return wrapper
     return decorator
-
-
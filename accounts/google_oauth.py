@@ -0,0 +1,142 @@
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from google.auth import jwt as google_jwt
+from requests.adapters import HTTPAdapter
+
+
+GOOGLE_OAUTH2_SETTINGS = settings.GOOGLE_OAUTH2_SETTINGS
+
+ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+CERTS_CACHE_KEY = "google:oauth2:certs"
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process wide session, keeps connections to Google alive between logins."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=2,  # token endpoint and certs
+                    pool_maxsize=GOOGLE_OAUTH2_SETTINGS["POOL_SIZE"],
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _timeout():
+    return GOOGLE_OAUTH2_SETTINGS["CONNECT_TIMEOUT_SECONDS"], GOOGLE_OAUTH2_SETTINGS["READ_TIMEOUT_SECONDS"]
+
+
+class GoogleCerts:
+    """
+    Google's ID token signing certs, key id -> PEM.
+
+    Kept in process memory and in Redis until the max-age Google serves them with runs out,
+    so verifying an ID token normally needs no network call. A token signed with a key id we
+    don't know yet (Google rotated its keys) forces a refresh, at most once every
+    REFRESH_COOLDOWN seconds per process so junk tokens can't make us hammer Google.
+    """
+
+    def __init__(self, url: str, default_max_age: int, refresh_cooldown: float):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.refresh_cooldown = refresh_cooldown
+        self._certs = None
+        self._expires_at = 0.0
+        self._refreshed_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        if self._certs is not None and time.time() < self._expires_at:
+            return self._certs
+        with self._lock:
+            if self._certs is None or time.time() >= self._expires_at:
+                entry = cache.get(CERTS_CACHE_KEY)
+                if entry is None or time.time() >= entry["expires_at"]:
+                    entry = self._fetch()
+                self._certs, self._expires_at = entry["certs"], entry["expires_at"]
+            return self._certs
+
+    def get_for_key(self, key_id) -> dict:
+        """Certs containing key_id if Google has it, refreshing once when it's unknown."""
+        certs = self.get()
+        if key_id in certs:
+            return certs
+        with self._lock:
+            if key_id not in self._certs and time.monotonic() - self._refreshed_at >= self.refresh_cooldown:
+                entry = self._fetch()
+                self._certs, self._expires_at = entry["certs"], entry["expires_at"]
+            return self._certs
+
+    def clear(self) -> None:
+        with self._lock:
+            self._certs = None
+            self._expires_at = 0.0
+            self._refreshed_at = float("-inf")
+
+    # ---- helpers ----
+    def _fetch(self) -> dict:
+        response = get_session().get(self.url, timeout=_timeout())
+        response.raise_for_status()
+        match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else self.default_max_age
+        entry = {"certs": response.json(), "expires_at": time.time() + max_age}
+        self._refreshed_at = time.monotonic()
+        if max_age > 0:
+            cache.set(CERTS_CACHE_KEY, entry, max_age)
+        return entry
+
+
+google_certs = GoogleCerts(
+    GOOGLE_OAUTH2_SETTINGS["CERTS_URL"],
+    default_max_age=GOOGLE_OAUTH2_SETTINGS["CERTS_DEFAULT_MAX_AGE"],
+    refresh_cooldown=GOOGLE_OAUTH2_SETTINGS["CERTS_REFRESH_COOLDOWN"],
+)
+
+
+def exchange_code(code: str) -> dict:
+    """Trade an authorization code for Google's tokens. Raises requests.RequestException."""
+    response = get_session().post(
+        GOOGLE_OAUTH2_SETTINGS["TOKEN_URL"],
+        data={
+            "code": code,
+            "client_id": settings.GOOGLE_OAUTH2_CLIENT_ID,
+            "client_secret": settings.GOOGLE_OAUTH2_CLIENT_SECRET,
+            "redirect_uri": settings.GOOGLE_OAUTH2_REDIRECT_URI,
+            "grant_type": "authorization_code",
+        },
+        timeout=_timeout(),
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def verify_id_token(token: str) -> dict:
+    """
+    Check an ID token's signature, audience, expiry and issuer locally against the cached
+    certs and return its claims. Raises ValueError for a bad token and
+    requests.RequestException when the certs can't be fetched.
+    """
+    key_id = google_jwt.decode_header(token).get("kid")
+    claims = google_jwt.decode(
+        token,
+        certs=google_certs.get_for_key(key_id),
+        audience=settings.GOOGLE_OAUTH2_CLIENT_ID,
+        clock_skew_in_seconds=GOOGLE_OAUTH2_SETTINGS["CLOCK_SKEW_SECONDS"],
+    )
+    if claims.get("iss") not in ISSUERS:
+        raise ValueError(f"Wrong issuer {claims.get('iss')!r}")
+    return claims
@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+import os
+import re
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection
+
+from .models import PointLedger, ProfileType, User, UserPoints, UserProfile
+
+
+# Bulk user import: row cleaning runs in worker processes, loading goes through COPY into a
+# temporary staging table and is merged with INSERT ... ON CONFLICT (PostgreSQL only).
+
+PHONE_RE = re.compile(r"^\+?\d{7,14}$")
+GENDERS = {"male", "female", "other"}
+TRUE_VALUES = {"1", "true", "yes", "y"}
+
+STAGE_COLUMNS = [
+    "email", "phone_number", "first_name", "last_name", "gender",
+    "date_of_birth", "is_referred", "profile_type", "points",
+]
+
+
+def read_rows(path: str, fmt: str):
+    """Yield (line number, row dict) from a CSV (with header) or NDJSON file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except ValueError:
+                        yield line_no, None
+
+
+def clean_row(row) -> tuple:
+    """Validate one input row and return it in STAGE_COLUMNS order. Raises ValueError."""
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+
+    def text(name, required=True, max_length=None):
+        value = row.get(name)
+        value = "" if value is None else str(value).strip()
+        if required and not value:
+            raise ValueError(f"{name} is required")
+        if max_length and len(value) > max_length:
+            raise ValueError(f"{name} is longer than {max_length} characters")
+        return value
+
+    email = text("email", max_length=254)
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError(f"invalid email {email!r}")
+    # Same normalisation as UserManager.create_user
+    local, _, domain = email.rpartition("@")
+    email = f"{local}@{domain.lower()}"
+
+    phone_number = text("phone_number").replace(" ", "").replace("-", "")
+    if not PHONE_RE.match(phone_number):
+        raise ValueError(f"invalid phone_number {phone_number!r}")
+
+    gender = text("gender").lower()
+    if gender not in GENDERS:
+        raise ValueError(f"gender must be one of {', '.join(sorted(GENDERS))}")
+
+    try:
+        date_of_birth = date.fromisoformat(text("date_of_birth"))
+    except ValueError:
+        raise ValueError("date_of_birth must be YYYY-MM-DD")
+
+    points = text("points", required=False) or "0"
+    if not points.lstrip("-").isdigit():
+        raise ValueError("points must be an integer")
+
+    return (
+        email,
+        phone_number,
+        text("first_name", max_length=30),
+        text("last_name", max_length=30),
+        gender,
+        date_of_birth.isoformat(),
+        text("is_referred", required=False).lower() in TRUE_VALUES,
+        text("profile_type", required=False) or None,
+        int(points),
+    )
+
+
+def clean_batch(batch: list) -> tuple:
+    """Worker entry point: returns (clean rows, [(line number, error)])."""
+    rows, errors = [], []
+    for line_no, row in batch:
+        try:
+            rows.append(clean_row(row))
+        except ValueError as e:
+            errors.append((line_no, str(e)))
+    return rows, errors
+
+
+def load_batch(rows: list) -> int:
+    """
+    COPY clean rows into a staging table and merge them into users, profiles and points.
+    Rows whose email or phone number already exists (or repeats within the batch) are
+    skipped. Must run inside a transaction; returns the number of users created.
+    """
+    qn = connection.ops.quote_name
+    user_table = qn(User._meta.db_table)
+    profile_table = qn(UserProfile._meta.db_table)
+    points_table = qn(UserPoints._meta.db_table)
+    ledger_table = qn(PointLedger._meta.db_table)
+    profile_type_table = qn(ProfileType._meta.db_table)
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TEMP TABLE import_users_stage (
+                email varchar(254), phone_number varchar(15), first_name varchar(30),
+                last_name varchar(30), gender varchar(10), date_of_birth date,
+                is_referred boolean, profile_type varchar(50), points integer
+            ) ON COMMIT DROP
+            """
+        )
+        cursor.copy_expert(
+            f"COPY import_users_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        # Keep the first row per phone number so the profile/points joins below stay one-to-one
+        cursor.execute(
+            """
+            DELETE FROM import_users_stage a USING import_users_stage b
+            WHERE a.phone_number = b.phone_number AND a.ctid > b.ctid
+            """
+        )
+        cursor.execute(
+            f"""
+            WITH new_users AS (
+                INSERT INTO {user_table} (
+                    password, is_superuser, email, is_email_verified, phone_number, auth_provider,
+                    is_active, is_deleted, is_staff, date_joined, created_at, updated_at
+                )
+                SELECT '!' || md5(random()::text || s.phone_number), false, s.email, false,
+                       s.phone_number, 'phone', true, false, false, now(), now(), now()
+                FROM import_users_stage s
+                ON CONFLICT DO NOTHING
+                RETURNING id, phone_number
+            ), new_profiles AS (
+                INSERT INTO {profile_table} (
+                    user_id, first_name, last_name, gender, date_of_birth, is_referred,
+                    profile_type_id, created_at, updated_at
+                )
+                SELECT u.id, s.first_name, s.last_name, s.gender, s.date_of_birth, s.is_referred,
+                       pt.id, now(), now()
+                FROM new_users u
+                JOIN import_users_stage s ON s.phone_number = u.phone_number
+                LEFT JOIN {profile_type_table} pt ON pt.type = s.profile_type
+            ), new_points AS (
+                INSERT INTO {points_table} (user_id, points, updated_at)
+                SELECT u.id, s.points, now()
+                FROM new_users u
+                JOIN import_users_stage s ON s.phone_number = u.phone_number
+            ), new_ledger AS (
+                -- Opening balances go through the ledger too, or reconcile_points would zero them
+                INSERT INTO {ledger_table} (user_id, action_id, points, created_at)
+                SELECT u.id, NULL, s.points, now()
+                FROM new_users u
+                JOIN import_users_stage s ON s.phone_number = u.phone_number
+                WHERE s.points <> 0
+            )
+            SELECT count(*) FROM new_users
+            """
+        )
+        return cursor.fetchone()[0]
+
+
+class Checkpoint:
+    """Number of input rows already committed, kept in a small JSON file next to the import."""
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = os.path.abspath(source)
+
+    def load(self) -> int:
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            data = json.load(f)
+        return data["rows_done"] if data.get("source") == self.source else 0
+
+    def save(self, rows_done: int) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"source": self.source, "rows_done": rows_done}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import (
+    PointLedger, PointLedgerArchive, User, UserArchive, UserProfile, UserProfileArchive,
+)
+
+USER_FIELDS = [f.attname for f in UserArchive._meta.concrete_fields if f.name != "archived_at"]
+PROFILE_FIELDS = [f.attname for f in UserProfileArchive._meta.concrete_fields if f.name != "archived_at"]
+LEDGER_FIELDS = [f.attname for f in PointLedgerArchive._meta.concrete_fields if f.name != "archived_at"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move users soft-deleted more than RETENTION_DAYS ago, with their profiles and points "
+        "ledger, into the archive tables, in small batches. Archived users stay readable "
+        "through User.all_objects.with_archived()."
+    )
+
+    def add_arguments(self, parser):
+        cfg = settings.USER_ARCHIVE_SETTINGS
+        parser.add_argument("--batch-size", type=int, default=cfg["BATCH_SIZE"])
+        parser.add_argument("--sleep", type=float, default=0.05, help="Pause between batches, seconds.")
+        parser.add_argument("--retention-days", type=int, default=cfg["RETENTION_DAYS"])
+        parser.add_argument("--max-batches", type=int, default=0, help="Stop after this many batches, 0 = no limit.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # Soft-deleted by a bulk update(), which skips User.save: retention starts now
+        stamped = User._base_manager.filter(is_deleted=True, deleted_at__isnull=True).update(deleted_at=now)
+        if stamped:
+            self.stdout.write(f"Set deleted_at on {stamped} user(s) deleted without it.")
+
+        cutoff = now - timedelta(days=options["retention_days"])
+        started = time.perf_counter()
+        archived = 0
+
+        batches = 0
+        while True:
+            with transaction.atomic():
+                count = self.archive_batch(cutoff, options["batch_size"])
+            archived += count
+            batches += 1
+            if count < options["batch_size"] or batches == options["max_batches"]:
+                break
+            time.sleep(options["sleep"])
+
+        elapsed = time.perf_counter() - started
+        rate = archived / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} user(s) in {elapsed:.1f}s ({rate:.0f} rows/s)."
+        ))
+
+    def archive_batch(self, cutoff, batch_size):
+        users = User._base_manager.filter(is_deleted=True, deleted_at__lt=cutoff).order_by("id")
+        if connection.vendor == "postgresql":
+            # SKIP LOCKED: a user being touched right now is left for the next run
+            users = users.select_for_update(skip_locked=True)
+        ids = list(users.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        UserArchive.objects.bulk_create(
+            UserArchive(**row) for row in User._base_manager.filter(id__in=ids).values(*USER_FIELDS)
+        )
+        UserProfileArchive.objects.bulk_create(
+            UserProfileArchive(**row) for row in UserProfile.objects.filter(user_id__in=ids).values(*PROFILE_FIELDS)
+        )
+        # The ledger is the points audit trail: it moves with the user, same transaction
+        PointLedgerArchive.objects.bulk_create(
+            (PointLedgerArchive(**row) for row in
+             PointLedger.objects.filter(user_id__in=ids).values(*LEDGER_FIELDS).iterator(chunk_size=batch_size)),
+            batch_size=batch_size,
+        )
+        # Cascades to profiles, the ledger rows copied above and UserPoints (their running sum)
+        User._base_manager.filter(id__in=ids).delete()
+        return len(ids)
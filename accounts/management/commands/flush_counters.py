@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from service.pointsservice.buffer import buffered_points
+
+
+class Command(BaseCommand):
+    help = (
+        "Flush the write-behind counter buffers (currently point awards) to the database. "
+        "Runs once, or every --interval seconds until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Keep flushing every this many seconds, 0 = flush once and exit. "
+                                 f"Suggested: {settings.COUNTER_BUFFER_SETTINGS['FLUSH_INTERVAL_SECONDS']}.")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            applied = buffered_points.flush()
+            elapsed = time.perf_counter() - started
+            if applied or not options["interval"]:
+                self.stdout.write(self.style.SUCCESS(f"Flushed {applied} point counter(s) in {elapsed:.2f}s."))
+            if not options["interval"]:
+                break
+            time.sleep(max(0, options["interval"] - elapsed))
@@ -0,0 +1,84 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from accounts.importer import Checkpoint, clean_batch, load_batch, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import students from a CSV (with header) or NDJSON file. Columns: email, "
+        "phone_number, first_name, last_name, gender, date_of_birth, and optionally "
+        "is_referred, profile_type (ProfileType.type) and points. Users whose email or "
+        "phone number already exists are skipped. Resumable with --checkpoint. PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "ndjson"],
+                            help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Rows per COPY and transaction.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                            help="Processes validating rows.")
+        parser.add_argument("--checkpoint", help="Checkpoint file; defaults to <path>.checkpoint")
+        parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("import_users loads through COPY and needs PostgreSQL.")
+
+        path = options["path"]
+        fmt = options["format"] or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+        batch_size = options["batch_size"]
+        checkpoint = Checkpoint(options["checkpoint"] or f"{path}.checkpoint", path)
+        if options["restart"]:
+            checkpoint.clear()
+
+        rows_done = checkpoint.load()
+        if rows_done:
+            self.stdout.write(f"Resuming after {rows_done} row(s) from {checkpoint.path}.")
+
+        rows = islice(read_rows(path, fmt), rows_done, None)
+        batches = iter(lambda: list(islice(rows, batch_size)), [])
+
+        created = invalid = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            # A bounded window of batches in flight keeps memory flat and the input order intact
+            pending = deque()
+            for batch in batches:
+                pending.append((len(batch), pool.submit(clean_batch, batch)))
+                if len(pending) > options["workers"] * 2:
+                    rows_done, created, invalid = self.commit(pending.popleft(), rows_done, created, invalid, checkpoint, started)
+            while pending:
+                rows_done, created, invalid = self.commit(pending.popleft(), rows_done, created, invalid, checkpoint, started)
+
+        checkpoint.clear()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {rows_done} row(s) read, {created} user(s) created, "
+            f"{rows_done - created - invalid} skipped as existing, {invalid} invalid, "
+            f"{elapsed:.1f}s."
+        ))
+
+    def commit(self, item, rows_done, created, invalid, checkpoint, started):
+        size, future = item
+        clean, errors = future.result()
+        for line_no, error in errors:
+            self.stderr.write(f"line {line_no}: {error}")
+
+        with transaction.atomic():
+            created += load_batch(clean) if clean else 0
+        # Only advanced once the batch is committed, so a crash re-reads at most one batch
+        rows_done += size
+        invalid += len(errors)
+        checkpoint.save(rows_done)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{rows_done} row(s), {created} created, {rows_done / elapsed:.0f} rows/s")
+        return rows_done, created, invalid
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage day partitions of the OtpVerification table (PostgreSQL). "
+        "--convert turns the plain table into one partitioned by created_at; "
+        "run without it (e.g. daily from cron) to create the partitions for the coming days. "
+        "Rows that already went to the default partition for such a day are moved into it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--convert", action="store_true",
+                            help="Convert the existing table. Copies every row; run in a maintenance window.")
+        parser.add_argument("--ahead", type=int, default=7, help="Days of partitions to create in advance.")
+        parser.add_argument("--keep-legacy", action="store_true",
+                            help="With --convert, keep the old table as <table>_legacy instead of dropping it.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning needs PostgreSQL.")
+
+        table = partitions.otp_table()
+        if options["convert"]:
+            if partitions.is_partitioned(table):
+                raise CommandError(f"{table} is already partitioned.")
+            self.convert(table, options["ahead"], options["keep_legacy"])
+        elif not partitions.is_partitioned(table):
+            raise CommandError(f"{table} is not partitioned yet, run with --convert first.")
+
+        today = timezone.now().date()
+        created = [
+            day for day in (today + timedelta(days=n) for n in range(options["ahead"] + 1))
+            if partitions.create_day_partition(table, day)
+        ]
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partition(s) ahead."))
+
+    def convert(self, table, ahead, keep_legacy):
+        qn = connection.ops.quote_name
+        legacy = f"{table}_legacy"
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+            # The partition key has to be part of the primary key, id stays unique in practice (uuid4)
+            cursor.execute(
+                f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+                "PARTITION BY RANGE (created_at)"
+            )
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, created_at)")
+            cursor.execute(f"CREATE INDEX ON {qn(table)} (identifier, is_used)")
+            cursor.execute(f"CREATE INDEX ON {qn(table)} (expires_at)")
+            cursor.execute(
+                f"CREATE TABLE {qn(partitions.default_partition_name(table))} PARTITION OF {qn(table)} DEFAULT"
+            )
+
+            cursor.execute(f"SELECT min(created_at), max(created_at) FROM {qn(legacy)}")
+            first, last = cursor.fetchone()
+            today = timezone.now().date()
+            day = first.date() if first else today
+            end = max(last.date() if last else today, today) + timedelta(days=ahead)
+            while day <= end:
+                partitions.create_day_partition(table, day)
+                day += timedelta(days=1)
+
+            cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+            self.stdout.write(f"Copied {cursor.rowcount} row(s) into {table}.")
+            if not keep_legacy:
+                cursor.execute(f"DROP TABLE {qn(legacy)}")
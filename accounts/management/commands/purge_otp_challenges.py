@@ -0,0 +1,128 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts import partitions
+from accounts.models import OtpVerification
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete (or archive) OTP challenges that expired more than RETENTION_HOURS ago, "
+        "in small batches so no long lock is held. On a partitioned table whole day "
+        "partitions past retention are dropped first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--sleep", type=float, default=0.05, help="Pause between batches, seconds.")
+        parser.add_argument("--retention-hours", type=int,
+                            default=settings.OTP_LOGIN_SETTINGS["RETENTION_HOURS"])
+        parser.add_argument("--archive", action="store_true",
+                            help="Move rows to <table>_archive instead of deleting them (PostgreSQL).")
+        parser.add_argument("--max-batches", type=int, default=0, help="Stop after this many batches, 0 = no limit.")
+
+    def handle(self, *args, **options):
+        if options["archive"] and connection.vendor != "postgresql":
+            raise CommandError("--archive needs PostgreSQL.")
+
+        cutoff = timezone.now() - timedelta(hours=options["retention_hours"])
+        table = partitions.otp_table()
+        started = time.perf_counter()
+        removed = 0
+
+        if options["archive"]:
+            self.ensure_archive_table(table)
+        elif partitions.is_partitioned(table):
+            removed += self.drop_partitions(table, cutoff)
+
+        batches = 0
+        while True:
+            with transaction.atomic():
+                if options["archive"]:
+                    count = self.archive_batch(table, cutoff, options["batch_size"])
+                else:
+                    count = self.delete_batch(cutoff, options["batch_size"])
+            removed += count
+            batches += 1
+            if count < options["batch_size"] or batches == options["max_batches"]:
+                break
+            time.sleep(options["sleep"])
+
+        elapsed = time.perf_counter() - started
+        rate = removed / elapsed if elapsed else 0
+        action = "Archived" if options["archive"] else "Purged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {removed} challenge(s) in {elapsed:.1f}s ({rate:.0f} rows/s)."
+        ))
+
+    def drop_partitions(self, table, cutoff):
+        # A day partition only holds rows created that day, all of which expired TTL_SECONDS
+        # later, so it can go as a whole once that is past the cutoff.
+        ttl = timedelta(seconds=settings.OTP_LOGIN_SETTINGS["TTL_SECONDS"])
+        qn = connection.ops.quote_name
+        dropped = 0
+        for day, name in sorted(partitions.day_partitions(table).items()):
+            _, end = partitions.day_bounds(day)
+            if end + ttl > cutoff:
+                break
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT count(*) FROM {qn(name)}")
+                dropped += cursor.fetchone()[0]
+            partitions.drop_day_partition(table, name)
+            self.stdout.write(f"Dropped partition {name}.")
+        return dropped
+
+    def delete_batch(self, cutoff, batch_size):
+        if connection.vendor == "postgresql":
+            qn = connection.ops.quote_name
+            table = partitions.otp_table()
+            with connection.cursor() as cursor:
+                # SKIP LOCKED: rows held by a running verify_otp are left for the next run
+                cursor.execute(
+                    f"""
+                    DELETE FROM {qn(table)} WHERE id IN (
+                        SELECT id FROM {qn(table)} WHERE expires_at < %s
+                        LIMIT %s FOR UPDATE SKIP LOCKED
+                    )
+                    """,
+                    [cutoff, batch_size],
+                )
+                return cursor.rowcount
+
+        ids = list(
+            OtpVerification.objects.filter(expires_at__lt=cutoff).values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        count, _ = OtpVerification.objects.filter(id__in=ids).delete()
+        return count
+
+    def ensure_archive_table(self, table):
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {qn(table + '_archive')} (LIKE {qn(table)} INCLUDING DEFAULTS)"
+            )
+
+    def archive_batch(self, table, cutoff, batch_size):
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {qn(table)} WHERE id IN (
+                        SELECT id FROM {qn(table)} WHERE expires_at < %s
+                        LIMIT %s FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING *
+                )
+                INSERT INTO {qn(table + '_archive')} SELECT * FROM moved
+                """,
+                [cutoff, batch_size],
+            )
+            return cursor.rowcount
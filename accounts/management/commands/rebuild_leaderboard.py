@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from service.pointsservice.leaderboard import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Redis leaderboards (global and per profile type) from UserPoints. "
+        "The new boards replace the old ones atomically once complete."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        ranked = leaderboard.rebuild(batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Ranked {ranked} user(s) in {elapsed:.1f}s."))
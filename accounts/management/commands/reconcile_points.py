@@ -0,0 +1,92 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from accounts.models import PointLedger, User, UserPoints
+from service.pointsservice.leaderboard import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild UserPoints balances from the PointLedger, batch by batch. Balances are locked "
+        "while they are summed, so awards made during the run are not lost. Corrections are applied "
+        "to the Redis leaderboards too. Meant to run periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0.05, help="Pause between batches, seconds.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report balances that drifted.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        checked = fixed = 0
+
+        last_user_id = 0
+        while True:
+            with transaction.atomic():
+                balances = list(UserPoints.objects.select_for_update()
+                                .filter(user_id__gt=last_user_id)
+                                .order_by("user_id")[:options["batch_size"]])
+                if not balances:
+                    break
+                # Summed after taking the locks, so any award committed meanwhile is included
+                totals = dict(PointLedger.objects
+                              .filter(user_id__in=[b.user_id for b in balances])
+                              .values("user_id").annotate(total=Sum("points"))
+                              .values_list("user_id", "total"))
+                drifted, deltas = [], {}
+                for balance in balances:
+                    total = totals.get(balance.user_id, 0)
+                    if balance.points != total:
+                        self.stdout.write(f"user {balance.user_id}: {balance.points} -> {total}")
+                        deltas[balance.user_id] = total - balance.points
+                        balance.points = total
+                        balance.updated_at = timezone.now()
+                        drifted.append(balance)
+                if drifted and not options["dry_run"]:
+                    UserPoints.objects.bulk_update(drifted, ["points", "updated_at"])
+                    self._publish(deltas)
+            checked += len(balances)
+            fixed += len(drifted)
+            last_user_id = balances[-1].user_id
+            time.sleep(options["sleep"])
+
+        # Users with ledger entries but no balance row at all. Rare, so one row at a time:
+        # get_or_create tells which rows this run inserted, a row a concurrent award created
+        # meanwhile (and published) is left alone
+        missing = (PointLedger.objects
+                   .exclude(user_id__in=UserPoints.objects.values("user_id"))
+                   .values("user_id").annotate(total=Sum("points"))
+                   .values_list("user_id", "total"))
+        created = []
+        for user_id, total in missing:
+            self.stdout.write(f"user {user_id}: missing -> {total}")
+            if options["dry_run"]:
+                created.append(user_id)
+                continue
+            with transaction.atomic():
+                _, inserted = UserPoints.objects.get_or_create(user_id=user_id, defaults={"points": total})
+                if inserted:
+                    created.append(user_id)
+                    self._publish({user_id: total})
+
+        elapsed = time.perf_counter() - started
+        verb = "Found" if options["dry_run"] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} balance(s) in {elapsed:.1f}s. {verb} {fixed + len(created)} drifted balance(s)."
+        ))
+
+    def _publish(self, deltas: dict) -> None:
+        # The boards only ever see deltas (PointsService.award_counts), so a correction is one too.
+        # Deleted users are off the boards and stay off; robust like PointsService
+        changes = {
+            user_id: (deltas[user_id], profile_type_id)
+            for user_id, profile_type_id in User.objects.filter(id__in=deltas)
+            .values_list("id", "profile__profile_type_id")
+        }
+        if changes:
+            transaction.on_commit(lambda: leaderboard.record(changes), robust=True)
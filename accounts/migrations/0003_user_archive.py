@@ -0,0 +1,88 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:01
+
+from django.db import migrations, models
+
+from accounts.operations import AddUniqueConstraintConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE UNIQUE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0002_user_search_trgm'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('password', models.CharField(max_length=128)),
+                ('last_login', models.DateTimeField(blank=True, null=True)),
+                ('is_superuser', models.BooleanField(default=False)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('is_email_verified', models.BooleanField(default=False)),
+                ('phone_number', models.CharField(max_length=15)),
+                ('auth_provider', models.CharField(choices=[('phone', 'Phone OTP'), ('google', 'Google OAuth')], default='phone')),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_deleted', models.BooleanField(default=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('is_staff', models.BooleanField(default=False)),
+                ('date_joined', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserProfileArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.BigIntegerField(db_index=True)),
+                ('first_name', models.CharField(max_length=30)),
+                ('last_name', models.CharField(max_length=30)),
+                ('gender', models.CharField(max_length=10)),
+                ('date_of_birth', models.DateField()),
+                ('is_referred', models.BooleanField(default=False)),
+                ('profile_type_id', models.BigIntegerField(null=True)),
+                ('bio', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Users deleted before deleted_at existed count from their last update
+        migrations.RunSQL(
+            "UPDATE accounts_user SET deleted_at = updated_at WHERE is_deleted",
+            migrations.RunSQL.noop,
+        ),
+        # Live-only uniqueness is built first, without blocking writes, so email and phone
+        # number are never unguarded; dropping the old table-wide constraints is then a
+        # catalog-only ALTER TABLE
+        AddUniqueConstraintConcurrently(
+            model_name='user',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('email',), name='user_email_live_uniq'),
+        ),
+        AddUniqueConstraintConcurrently(
+            model_name='user',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('phone_number',), name='user_phone_live_uniq'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='phone_number',
+            field=models.CharField(max_length=15),
+        ),
+    ]
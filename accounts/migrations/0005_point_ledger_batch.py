@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_point_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointledger',
+            name='batch',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.CreateModel(
+            name='AppliedPointBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.CharField(max_length=32, unique=True)),
+                ('applied_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
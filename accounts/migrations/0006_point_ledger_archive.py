@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_point_ledger_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointLedgerArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.BigIntegerField(db_index=True)),
+                ('action_id', models.BigIntegerField(null=True)),
+                ('points', models.IntegerField()),
+                ('batch', models.CharField(blank=True, max_length=32, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -1,6 +1,9 @@
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Concat
 from django.utils import timezone
 
 
@@ -45,6 +48,13 @@ class AllUsersManager(BaseUserManager):
     def get_queryset(self):
         return super().get_queryset()  # no filter
 
+    def with_archived(self, *fields):
+        """
+        values(*fields) of live, soft-deleted and archived users (UNION ALL with UserArchive).
+        Read only; `fields` must be columns UserArchive keeps.
+        """
+        return self.values(*fields).union(UserArchive.objects.values(*fields), all=True)
+
 
 class AuthProvider(models.TextChoices):
     PHONE = 'phone', 'Phone OTP'
@@ -52,9 +62,10 @@ class AuthProvider(models.TextChoices):
 
 class User(AbstractBaseUser, PermissionsMixin):
     # Core authentication fields
-    email = models.EmailField(unique=True, blank=True, null=True)
+    # Unique among live users only, see Meta.constraints
+    email = models.EmailField(blank=True, null=True)
     is_email_verified = models.BooleanField(default=False)
-    phone_number = models.CharField(max_length=15, unique=True)
+    phone_number = models.CharField(max_length=15)
     auth_provider = models.CharField(
         choices=AuthProvider.choices,
         default=AuthProvider.PHONE
@@ -63,6 +74,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     # System fields
     is_active = models.BooleanField(default=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
 
@@ -75,9 +87,35 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # A deleted account keeps its row but frees its email and phone number
+        constraints = [
+            models.UniqueConstraint(fields=["email"], condition=Q(is_deleted=False), name="user_email_live_uniq"),
+            models.UniqueConstraint(fields=["phone_number"], condition=Q(is_deleted=False), name="user_phone_live_uniq"),
+        ]
+        # pg_trgm indexes behind accounts.search, they also serve LIKE '%q%'
+        indexes = [
+            GinIndex(fields=["email"], opclasses=["gin_trgm_ops"], name="user_email_trgm"),
+            GinIndex(fields=["phone_number"], opclasses=["gin_trgm_ops"], name="user_phone_trgm"),
+        ]
+
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        # deleted_at follows is_deleted whoever flips it (API, admin, shell); archive_deleted_users
+        # counts retention from it
+        if self.is_deleted != (self.deleted_at is not None):
+            self.deleted_at = timezone.now() if self.is_deleted else None
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "is_deleted" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "deleted_at"}
+        super().save(*args, **kwargs)
+
+
+# "first_name last_name", shared by the trigram index and accounts.search so the planner matches them
+FULL_NAME = Concat("first_name", Value(" "), "last_name")
+
 
 class ProfileType(models.Model):
     type = models.CharField(max_length=50, unique=True)
@@ -105,6 +143,10 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(OpClass(FULL_NAME, name="gin_trgm_ops"), name="profile_full_name_trgm"),
+        ]
 
     @property
     def full_name(self):
@@ -126,6 +168,50 @@ class UserProfile(models.Model):
 
 
 
+# Long-deleted users and their profiles, moved out of the hot tables by archive_deleted_users.
+# Same columns as User / UserProfile, no constraints.
+class UserArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    password = models.CharField(max_length=128)
+    last_login = models.DateTimeField(null=True, blank=True)
+    is_superuser = models.BooleanField(default=False)
+    email = models.EmailField(blank=True, null=True)
+    is_email_verified = models.BooleanField(default=False)
+    phone_number = models.CharField(max_length=15)
+    auth_provider = models.CharField(choices=AuthProvider.choices, default=AuthProvider.PHONE)
+    is_active = models.BooleanField(default=True)
+    is_deleted = models.BooleanField(default=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    is_staff = models.BooleanField(default=False)
+    date_joined = models.DateTimeField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived user {self.id}"
+
+
+class UserProfileArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.BigIntegerField(db_index=True)
+    first_name = models.CharField(max_length=30)
+    last_name = models.CharField(max_length=30)
+    gender = models.CharField(max_length=10)
+    date_of_birth = models.DateField()
+    is_referred = models.BooleanField(default=False)
+    profile_type_id = models.BigIntegerField(null=True)
+    bio = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived profile of user {self.user_id}"
+
+
+
+
 ########################################### User Points related models ########################################################
 class PointAction(models.Model):
     name = models.CharField(max_length=255)
@@ -144,6 +230,47 @@ class UserPoints(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.points} pts"
+
+
+class PointLedger(models.Model):
+    """Append-only record of every award. UserPoints.points is the running sum per user."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="point_entries")
+    action = models.ForeignKey(PointAction, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_entries")
+    points = models.IntegerField()
+    batch = models.CharField(max_length=32, null=True, blank=True)  # counter buffer flush that wrote the row
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.points:+d} pts"
+
+
+class AppliedPointBatch(models.Model):
+    """Counter buffer flushes already written to the ledger; the unique key makes a replay a no-op."""
+    batch = models.CharField(max_length=32, unique=True)
+    applied_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.batch
+
+
+# Ledger rows of archived users, moved by archive_deleted_users with the user. Same columns
+# as PointLedger, no foreign keys.
+class PointLedgerArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.BigIntegerField(db_index=True)
+    action_id = models.BigIntegerField(null=True)
+    points = models.IntegerField()
+    batch = models.CharField(max_length=32, null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived {self.user_id}: {self.points:+d} pts"
     
 
 # OTP  model
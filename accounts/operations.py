@@ -0,0 +1,54 @@
+from django.contrib.postgres.operations import AddIndexConcurrently, NotInTransactionMixin
+from django.db.migrations.operations import AddConstraint
+
+
+# Migration operations for PostgreSQL-only schema objects and online (CONCURRENTLY) builds.
+# Other backends (SQLite for local runs and tests) skip PostgreSQL-only objects and build the
+# rest the usual way; the model state is updated either way.
+
+
+class PostgresAddIndexConcurrently(AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY on PostgreSQL, nothing elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return "Concurrently create index %s on model %s" % (self.index.name, self.model_name)
+
+
+class AddUniqueConstraintConcurrently(NotInTransactionMixin, AddConstraint):
+    """
+    A conditional UniqueConstraint built as CREATE UNIQUE INDEX CONCURRENTLY on PostgreSQL,
+    so adding it doesn't block writes to a large table. Other backends add it as usual.
+    """
+
+    atomic = False
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            # A conditional unique constraint is a unique index, see _create_unique_sql
+            sql = str(self.constraint.create_sql(model, schema_editor))
+            schema_editor.execute(sql.replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY", 1))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.execute(
+                "DROP INDEX CONCURRENTLY IF EXISTS %s" % schema_editor.quote_name(self.constraint.name)
+            )
+
+    def describe(self):
+        return "Concurrently create unique constraint %s on model %s" % (self.constraint.name, self.model_name)
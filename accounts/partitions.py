@@ -0,0 +1,115 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_tz
+
+from django.db import connection, transaction
+
+
+# Helpers for the optional day partitioning of OtpVerification (PostgreSQL only)
+
+PARTITION_PREFIX = "p"
+
+
+def otp_table() -> str:
+    from .models import OtpVerification
+    return OtpVerification._meta.db_table
+
+
+def is_partitioned(table: str = None) -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [table or otp_table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def day_partitions(table: str = None) -> dict:
+    """Existing day partitions as {day: partition name}; the default partition is left out."""
+    table = table or otp_table()
+    prefix = f"{table}_{PARTITION_PREFIX}"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and suffix.isdigit():
+            partitions[datetime.strptime(suffix, "%Y%m%d").date()] = name
+    return partitions
+
+
+def day_bounds(day: date):
+    """[start, end) of the rows created on `day`, UTC."""
+    start = datetime.combine(day, time.min, tzinfo=dt_tz.utc)
+    return start, start + timedelta(days=1)
+
+
+def create_day_partition(table: str, day: date) -> bool:
+    """
+    Create the partition holding rows created on `day` (UTC). Returns False if it exists.
+
+    Rows for the day already in the default partition (written before the partition was
+    created) are moved into it: PostgreSQL refuses to create a partition whose range the
+    default partition still holds rows for.
+    """
+    if day in day_partitions(table):
+        return False
+    start, end = day_bounds(day)
+    qn = connection.ops.quote_name
+    name, default = partition_name(table, day), default_partition_name(table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {qn(default)} WHERE created_at >= %s AND created_at < %s)",
+            [start, end],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)",
+                [start, end],
+            )
+            return True
+
+        # Built standalone, filled from the default partition, then attached. The default
+        # partition stays locked until commit, so no new row for the day can land there.
+        cursor.execute(f"LOCK TABLE {qn(default)} IN EXCLUSIVE MODE")
+        cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {qn(default)} WHERE created_at >= %s AND created_at < %s
+                RETURNING *
+            )
+            INSERT INTO {qn(name)} SELECT * FROM moved
+            """,
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+    return True
+
+
+def drop_day_partition(table: str, name: str) -> None:
+    # Detach first so the drop only takes a lock on the partition itself
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+        cursor.execute(f"DROP TABLE {qn(name)}")
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from manipalapp.metrics import record_cache
+
+
+PERMISSION_CACHE_SETTINGS = settings.PERMISSION_CACHE_SETTINGS
+
+
+def _version_key(profile_type_id) -> str:
+    return f"perms:version:{profile_type_id}"
+
+
+def _set_key(profile_type_id, version) -> str:
+    return f"perms:set:{profile_type_id}:{version}"
+
+
+class PermissionCatalog:
+    """
+    Compiled permission sets, one frozenset of codes per ProfileType.
+
+    Every ProfileType has a version counter in Redis that accounts.signals bumps whenever
+    its permissions change. Sets are shared between workers in Redis under
+    perms:set:<profile_type_id>:<version> and kept in process memory as (version, codes).
+    Local versions are re-validated against Redis at most once every VERSION_CHECK_SECONDS,
+    so a permission check is normally a pure in-memory lookup.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._entries = {}  # profile_type_id -> (version, frozenset of codes)
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "redis_hits": 0, "misses": 0}
+
+    def get_permissions(self, profile_type_id) -> frozenset:
+        return self.get_entry(profile_type_id)[1]
+
+    def get_entry(self, profile_type_id) -> tuple:
+        """(version, codes) of a ProfileType, the codes being the set compiled under that version."""
+        self._revalidate()
+        entry = self._entries.get(profile_type_id)
+        record_cache("permissions_local", entry is not None)
+        if entry is not None:
+            self._stats["hits"] += 1
+            return entry
+
+        # Read the version before loading so a concurrent bump can never label new data as old
+        version = self._current_version(profile_type_id)
+        codes = cache.get(_set_key(profile_type_id, version))
+        record_cache("permissions_redis", codes is not None)
+        if codes is None:
+            self._stats["misses"] += 1
+            codes = self._load(profile_type_id)
+            cache.set(_set_key(profile_type_id, version), codes, PERMISSION_CACHE_SETTINGS["REDIS_TTL_SECONDS"])
+        else:
+            self._stats["redis_hits"] += 1
+
+        entry = (version, codes)
+        with self._lock:
+            self._entries[profile_type_id] = entry
+        return entry
+
+    def get_version(self, profile_type_id) -> int:
+        """Current permission version of a ProfileType, served from memory when possible."""
+        self._revalidate()
+        entry = self._entries.get(profile_type_id)
+        if entry is not None:
+            return entry[0]
+        return self._current_version(profile_type_id)
+
+    def bump(self, *profile_type_ids) -> None:
+        """Invalidate the compiled sets of the given ProfileTypes in every process."""
+        for profile_type_id in profile_type_ids:
+            key = _version_key(profile_type_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                self._init_version(key)
+            with self._lock:
+                self._entries.pop(profile_type_id, None)
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["redis_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    # ---- helpers ----
+    def _load(self, profile_type_id) -> frozenset:
+        from .models import Permission
+        return frozenset(
+            Permission.objects.filter(profile_types=profile_type_id).values_list("code", flat=True)
+        )
+
+    def _current_version(self, profile_type_id) -> int:
+        key = _version_key(profile_type_id)
+        version = cache.get(key)
+        if version is None:
+            version = self._init_version(key)
+        return version
+
+    def _init_version(self, key) -> int:
+        # Seed from the clock rather than 1 so that a version key lost from Redis can never
+        # point back at a permission set cached under an older, reused number.
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        return cache.get(key)
+
+    def _revalidate(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if not self._entries:
+            return
+
+        profile_type_ids = list(self._entries)
+        versions = cache.get_many([_version_key(pk) for pk in profile_type_ids])
+        with self._lock:
+            for profile_type_id in profile_type_ids:
+                entry = self._entries.get(profile_type_id)
+                if entry and versions.get(_version_key(profile_type_id)) != entry[0]:
+                    del self._entries[profile_type_id]
+
+
+permission_catalog = PermissionCatalog(check_interval=PERMISSION_CACHE_SETTINGS["VERSION_CHECK_SECONDS"])
@@ -12,6 +12,11 @@ class UserOut(BaseModel):
     model_config = ConfigDict(from_attributes=True) 
 
 
+class UserPageOut(BaseModel):
+    items: list[UserOut]
+    next: Optional[str] = None  # cursor for the following page, None on the last one
+
+
 # Input schema
 class UserCreate(BaseModel):
     email: EmailStr
@@ -34,6 +39,51 @@ class UserPatch(BaseModel):
     date_of_birth: Optional[date] = None
 
 
+# Bulk admin patch schema
+class UserBulkPatchItem(BaseModel):
+    id: int
+    email: Optional[EmailStr] = None
+    phone_number: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    bio: Optional[str] = None
+    date_of_birth: Optional[date] = None
+
+
+class UserBulkPatchIn(BaseModel):
+    items: list[UserBulkPatchItem]
+
+
+class UserBulkPatchOut(BaseModel):
+    updated_users: int
+    updated_profiles: int
+    missing: list[int]
+
+
+class UserSearchHit(BaseModel):
+    id: int
+    email: Optional[str] = None
+    phone_number: str
+    full_name: Optional[str] = None  # None when the user has no profile yet
+    rank: float
+
+
+class UserSearchOut(BaseModel):
+    items: list[UserSearchHit]
+    next: Optional[str] = None
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int  # 1 is the top
+    user_id: int
+    points: int
+    full_name: Optional[str] = None
+
+
+class LeaderboardOut(BaseModel):
+    items: list[LeaderboardEntry]
+
+
 class GoogleAuthRequest(BaseModel):
     code: str
     error: Optional[str] = None
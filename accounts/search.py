@@ -0,0 +1,67 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Concat, Greatest
+
+from .models import FULL_NAME, User, UserProfile
+
+
+# Ranked user search over email, phone number and profile name. On PostgreSQL each branch is
+# answered by its pg_trgm GIN index (see the Meta.indexes of User and UserProfile); other
+# backends fall back to icontains with a flat rank, good enough for local runs and tests.
+
+MIN_QUERY_LENGTH = 3  # shorter terms have no trigram to look up
+
+
+def _is_postgres() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def matching_ids(term: str):
+    """Ids of users whose email, phone number or full name match `term`, as a subquery."""
+    names = UserProfile.objects.alias(full_name=FULL_NAME)
+    if not _is_postgres():
+        names = names.filter(full_name__icontains=term).values("user_id")
+        return User.objects.filter(
+            Q(email__icontains=term) | Q(phone_number__contains=term) | Q(id__in=names)
+        ).values("id")
+
+    # One index scan per branch; OR-ing them in a single WHERE would defeat the profile index.
+    # The caller's queryset decides about deleted users.
+    by_email = User.all_objects.filter(email__trigram_word_similar=term).values("id")
+    by_phone = User.all_objects.filter(phone_number__contains=term).values("id")
+    by_name = names.filter(full_name__trigram_word_similar=term).values("user_id")
+    return by_email.union(by_phone, by_name)
+
+
+def rank_expression(term: str):
+    """Best of the three match scores, in [0, 1]. A phone substring match counts as exact."""
+    if not _is_postgres():
+        return Value(1.0, output_field=FloatField())
+    full_name = Concat("profile__first_name", Value(" "), "profile__last_name")
+    # double precision so the rank round-trips exactly through the cursor
+    return Cast(
+        Greatest(
+            TrigramWordSimilarity(term, "email"),
+            TrigramWordSimilarity(term, full_name),
+            Case(When(phone_number__contains=term, then=Value(1.0)), default=Value(0.0)),
+        ),
+        FloatField(),
+    )
+
+
+def find_users(term: str, limit: int, after: tuple = None) -> list:
+    """
+    Up to `limit` matches ordered by rank, best first, then id.
+    `after` is the (rank, id) of the last row of the previous page.
+    """
+    users = (User.objects
+        .filter(id__in=matching_ids(term))
+        .annotate(rank=rank_expression(term))
+        .order_by("-rank", "id"))
+    if after is not None:
+        rank, last_id = after
+        users = users.filter(Q(rank__lt=rank) | Q(rank=rank, id__gt=last_id))
+    return list(users.values(
+        "id", "email", "phone_number", "profile__first_name", "profile__last_name", "rank",
+    )[:limit])
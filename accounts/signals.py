@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Permission, ProfileType, User, UserProfile
+from .permission_catalog import permission_catalog
+from .user_cache import invalidate_user
+from service.pointsservice.leaderboard import leaderboard
+
+
+# ---- Authenticated user cache ----
+# Dropped right away and again after commit: a get_user running between the two still reads
+# the old committed row and would otherwise cache it under a fresh generation.
+def _invalidate_now_and_after_commit(user_id):
+    invalidate_user(user_id)
+    transaction.on_commit(lambda: invalidate_user(user_id), robust=True)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    _invalidate_now_and_after_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_cached_user_profile(sender, instance, **kwargs):
+    # The cached user carries its profile, so a profile write makes it stale too
+    _invalidate_now_and_after_commit(instance.user_id)
+
+
+# ---- Leaderboard ----
+# After commit and robust, like PointsService: a rolled back save must not move the board
+# and a Redis outage must not fail the save. rebuild_leaderboard repairs anything missed.
+@receiver(post_save, sender=User)
+def drop_deleted_user_from_leaderboard(sender, instance, **kwargs):
+    if instance.is_deleted:
+        transaction.on_commit(lambda: leaderboard.remove(instance.pk), robust=True)
+
+
+@receiver(post_delete, sender=User)
+def drop_removed_user_from_leaderboard(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: leaderboard.remove(user_id), robust=True)
+
+
+@receiver(post_save, sender=UserProfile)
+def move_user_to_profile_type_board(sender, instance, **kwargs):
+    user_id, profile_type_id = instance.user_id, instance.profile_type_id
+    transaction.on_commit(lambda: leaderboard.move(user_id, profile_type_id), robust=True)
+
+
+# ---- Permission catalog ----
+# After commit and robust like the leaderboard: bumping inside the admin's transaction would
+# let another worker read the new version, load the still-uncommitted old set and cache it
+# under that version until REDIS_TTL. A rolled back change leaves the version alone.
+def _bump_after_commit(*profile_type_ids):
+    transaction.on_commit(lambda: permission_catalog.bump(*profile_type_ids), robust=True)
+
+
+def _bump_all_after_commit():
+    transaction.on_commit(
+        lambda: permission_catalog.bump(*ProfileType.objects.values_list("id", flat=True)), robust=True,
+    )
+
+
+@receiver(m2m_changed, sender=ProfileType.permissions.through)
+def bump_permissions_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        _bump_after_commit(instance.pk)
+    elif pk_set:
+        _bump_after_commit(*pk_set)
+    else:
+        # permission.profile_types.clear(): the affected types are no longer known
+        _bump_all_after_commit()
+
+
+@receiver([post_save, post_delete], sender=ProfileType)
+def bump_permissions_on_profile_type_change(sender, instance, **kwargs):
+    _bump_after_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Permission)
+def bump_permissions_on_permission_change(sender, instance, **kwargs):
+    # A renamed or deleted code can affect any type that held it
+    _bump_all_after_commit()
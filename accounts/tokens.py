@@ -0,0 +1,88 @@
+from django.conf import settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .constants import PERMISSION_BITS
+from .permission_catalog import permission_catalog
+
+
+# Claims added to access tokens when settings.JWT_PERMISSION_CLAIMS is on
+PROFILE_TYPE_CLAIM = "pt"
+PERMISSION_VERSION_CLAIM = "pv"
+PERMISSIONS_CLAIM = "perms"
+
+
+def encode_permissions(codes) -> int:
+    mask = 0
+    for code in codes:
+        mask |= PERMISSION_BITS.get(code, 0)
+    return mask
+
+
+def add_permission_claims(access, user) -> None:
+    """Stamp the user's profile type, its permission bitmask and permission version on an access token."""
+    profile = getattr(user, "profile", None)
+    if profile is None or not profile.profile_type_id:
+        return
+
+    profile_type_id = profile.profile_type_id
+    # One lookup: reading the version separately could pair these codes with a newer version
+    version, codes = permission_catalog.get_entry(profile_type_id)
+    access[PROFILE_TYPE_CLAIM] = profile_type_id
+    access[PERMISSION_VERSION_CLAIM] = version
+    access[PERMISSIONS_CLAIM] = encode_permissions(codes)
+
+
+def token_permission_mask(token, user):
+    """
+    Return the permission bitmask carried by a validated access token, or None when the
+    claims can't be trusted: claims mode is off, the token has no claims, the user's
+    profile type changed, or the ProfileType's permission version moved on since issue.
+    """
+    if not settings.JWT_PERMISSION_CLAIMS or token is None:
+        return None
+
+    profile_type_id = token.get(PROFILE_TYPE_CLAIM)
+    if profile_type_id is None:
+        return None
+
+    profile = getattr(user, "profile", None)
+    if profile is None or profile.profile_type_id != profile_type_id:
+        return None
+
+    if token.get(PERMISSION_VERSION_CLAIM) != permission_catalog.get_version(profile_type_id):
+        return None
+    return token.get(PERMISSIONS_CLAIM, 0)
+
+
+class PermissionClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token whose derived access token carries permission claims.
+    The claims are only put on the access token so a refreshed access token never inherits stale ones.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token._claims_user = user
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = getattr(self, "_claims_user", None)
+        if settings.JWT_PERMISSION_CLAIMS and user is not None:
+            add_permission_claims(access, user)
+        return access
+
+
+class PermissionClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = PermissionClaimsRefreshToken
+
+
+def issue_tokens(user) -> dict:
+    refresh = PermissionClaimsRefreshToken.for_user(user)
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+    }
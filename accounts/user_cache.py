@@ -0,0 +1,210 @@
+import copy
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django_redis.cache import RedisCache
+
+from manipalapp.async_redis import get_async_redis
+from manipalapp.metrics import record_cache
+from manipalapp.utils import LRUTTLCache
+
+
+USER_CACHE_SETTINGS = settings.USER_CACHE_SETTINGS
+
+# Level 1: per-process LRU, short TTL so other workers converge quickly after an invalidation.
+_local = LRUTTLCache(
+    maxsize=USER_CACHE_SETTINGS["LOCAL_MAX_SIZE"],
+    ttl=USER_CACHE_SETTINGS["LOCAL_TTL_SECONDS"],
+)
+
+
+def _redis_key(user_id) -> str:
+    return f"auth:user:{user_id}"
+
+
+def _generation_key(user_id) -> str:
+    return f"auth:user:generation:{user_id}"
+
+
+def _response_key(user_id) -> str:
+    return f"user:out:{user_id}"
+
+
+def _user_queryset(user_id):
+    # profile and profile_type are pulled in the same query so that the permission
+    # checks running after authentication don't go back to the database.
+    # Deleted users are already excluded by UserManager.
+    User = get_user_model()
+    return (User.objects
+            .select_related("profile__profile_type")
+            .filter(pk=user_id, is_active=True))
+
+
+def _load_user(user_id):
+    return _user_queryset(user_id).first()
+
+
+def get_user(user_id):
+    """
+    Return the active, non-deleted user for `user_id` or None.
+
+    Looks in the process-local LRU first, then Redis (CACHES["default"]) and only then
+    hits the database. A copy is returned so request code can mutate it freely.
+
+    Redis holds (generation, user) next to a per-user generation token that
+    invalidate_user deletes. A row is stored under the generation read before loading
+    it, so a load that raced an invalidation is written under a dead generation and
+    never served.
+    """
+    # The token carries user_id as a string while signals pass the int pk, the key normalises both
+    key = _redis_key(user_id)
+    user = _local.get(key)
+    record_cache("user_local", user is not None)
+    if user is None:
+        generation_key = _generation_key(user_id)
+        found = cache.get_many([key, generation_key])
+        user, generation = _current(found.get(key), found.get(generation_key))
+        record_cache("user_redis", user is not None)
+        if user is None:
+            generation = generation or _new_generation(generation_key)
+            user = _load_user(user_id)
+            if user is None:
+                return None
+            if generation is not None:
+                cache.set(key, (generation, user), USER_CACHE_SETTINGS["REDIS_TTL_SECONDS"])
+        _local.set(key, user)
+    return copy.deepcopy(user)
+
+
+async def aget_user(user_id):
+    """get_user for async views: Redis through redis.asyncio, the database through the async ORM."""
+    key = _redis_key(user_id)
+    user = _local.get(key)
+    record_cache("user_local", user is not None)
+    if user is None:
+        generation_key = _generation_key(user_id)
+        found = await _acache_get_many([key, generation_key])
+        user, generation = _current(found.get(key), found.get(generation_key))
+        record_cache("user_redis", user is not None)
+        if user is None:
+            generation = generation or await _anew_generation(generation_key)
+            user = await _user_queryset(user_id).afirst()
+            if user is None:
+                return None
+            if generation is not None:
+                await _acache_set(key, (generation, user), USER_CACHE_SETTINGS["REDIS_TTL_SECONDS"])
+        _local.set(key, user)
+    return copy.deepcopy(user)
+
+
+def _current(entry, generation):
+    """(user, generation): the cached user when it was stored under the live generation."""
+    if entry is not None and generation is not None and entry[0] == generation:
+        return entry[1], generation
+    return None, generation
+
+
+def _new_generation(generation_key):
+    # add() so that concurrent loaders agree on one token; None when an invalidation
+    # deleted it again in between, the load is then not cached at all
+    cache.add(generation_key, uuid.uuid4().hex, USER_CACHE_SETTINGS["GENERATION_TTL_SECONDS"])
+    return cache.get(generation_key)
+
+
+async def _anew_generation(generation_key):
+    await _acache_add(generation_key, uuid.uuid4().hex, USER_CACHE_SETTINGS["GENERATION_TTL_SECONDS"])
+    return (await _acache_get_many([generation_key])).get(generation_key)
+
+
+# django-redis has no native async API (its a* methods run the sync client in a thread), so
+# async callers talk to the same server with redis.asyncio, using django-redis' own key
+# format and serializer so both sides read each other's entries.
+async def _acache_get(key):
+    backend = caches["default"]
+    if not isinstance(backend, RedisCache):
+        return await backend.aget(key)
+    raw = await get_async_redis().get(backend.client.make_key(key))
+    return None if raw is None else backend.client.decode(raw)
+
+
+async def _acache_get_many(keys) -> dict:
+    backend = caches["default"]
+    if not isinstance(backend, RedisCache):
+        return await backend.aget_many(keys)
+    raws = await get_async_redis().mget([backend.client.make_key(key) for key in keys])
+    return {key: backend.client.decode(raw) for key, raw in zip(keys, raws) if raw is not None}
+
+
+async def _acache_add(key, value, timeout) -> None:
+    backend = caches["default"]
+    if not isinstance(backend, RedisCache):
+        await backend.aadd(key, value, timeout)
+        return
+    await get_async_redis().set(backend.client.make_key(key), backend.client.encode(value), ex=timeout, nx=True)
+
+
+async def _acache_set(key, value, timeout) -> None:
+    backend = caches["default"]
+    if not isinstance(backend, RedisCache):
+        await backend.aset(key, value, timeout)
+        return
+    await get_async_redis().set(backend.client.make_key(key), backend.client.encode(value), ex=timeout)
+
+
+def invalidate_user(user_id) -> None:
+    """
+    Drop `user_id` from both cache levels, along with its cached GET /user/ body.
+    Deleting the generation also retires a copy that a concurrent get_user loaded before
+    the change and stores afterwards. Other processes expire their LRU copy after
+    LOCAL_TTL_SECONDS.
+    """
+    key = _redis_key(user_id)
+    _local.pop(key)
+    cache.delete_many([key, _generation_key(user_id), _response_key(user_id)])
+
+
+def invalidate_users(user_ids) -> None:
+    """invalidate_user for many users, in one Redis round trip."""
+    keys = []
+    for user_id in user_ids:
+        key = _redis_key(user_id)
+        _local.pop(key)
+        keys += [key, _generation_key(user_id), _response_key(user_id)]
+    if keys:
+        cache.delete_many(keys)
+
+
+def user_validators(user):
+    """ETag and Last-Modified for a user's representation, from the user's and profile's updated_at."""
+    stamps = [user.updated_at]
+    profile = getattr(user, "profile", None)
+    if profile is not None:
+        stamps.append(profile.updated_at)
+    etag = '"%s-%s"' % (user.pk, "-".join(str(int(ts.timestamp() * 1_000_000)) for ts in stamps))
+    return etag, max(stamps)
+
+
+def get_serialized(user, etag: str, serialize) -> bytes:
+    """Return the cached body for `etag`, or build it with serialize(user) and cache it."""
+    key = _response_key(user.pk)
+    cached = cache.get(key)
+    record_cache("user_response", cached is not None and cached[0] == etag)
+    if cached is not None and cached[0] == etag:
+        return cached[1]
+    body = serialize(user)
+    cache.set(key, (etag, body), USER_CACHE_SETTINGS["REDIS_TTL_SECONDS"])
+    return body
+
+
+async def aget_serialized(user, etag: str, serialize) -> bytes:
+    """get_serialized for async views."""
+    key = _response_key(user.pk)
+    cached = await _acache_get(key)
+    record_cache("user_response", cached is not None and cached[0] == etag)
+    if cached is not None and cached[0] == etag:
+        return cached[1]
+    body = serialize(user)
+    await _acache_set(key, (etag, body), USER_CACHE_SETTINGS["REDIS_TTL_SECONDS"])
+    return body
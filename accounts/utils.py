@@ -1,4 +1,4 @@
-import os, hmac, hashlib, random, string, time
+import os, hmac, hashlib, random, string, time, base64
 from typing import Tuple
 from django.conf import settings
 from datetime import datetime, timedelta, timezone as dt_tz
@@ -20,4 +20,36 @@ def hash_code(code: str, salt: str) -> str:
 
 
 def constant_time_eq(a: str, b: str) -> bool:
-    return hmac.compare_digest(a, b)
\ No newline at end of file
+    return hmac.compare_digest(a, b)
+
+
+# Keyset pagination cursors: opaque to clients, just the last id seen
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, last_id = raw.split(":", 1)
+        if prefix != "id":
+            raise ValueError
+        return int(last_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+# Search results are ordered by rank first, so their cursor carries the last rank as well
+def encode_search_cursor(rank: float, last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"rank:{rank!r}:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, rank, last_id = raw.split(":", 2)
+        if prefix != "rank":
+            raise ValueError
+        return float(rank), int(last_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,118 @@
+"""
+API JSON serialization benchmark.
+
+Times GET /users/ for one large page (default 10k rows) through the real endpoint (values_list
+rows written with orjson) and through a copy of the previous endpoint on a NinjaAPI with the
+stock JSON renderer, where every row went through UserPageOut validation (EmailStr included).
+Both run behind the same JWT auth and permission check. Reports ms per request and checks
+that the two bodies decode to the same data.
+
+Run it against a scratch, migrated database only: it inserts users, a profile type and a
+permission for the benchmark user.
+
+    python benchmarks/api_json.py --rows 10000 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manipalapp.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import path  # noqa: E402
+from ninja import NinjaAPI  # noqa: E402
+
+from accounts import api as accounts_api, decorators  # noqa: E402
+from accounts.constants import PERMISSIONS  # noqa: E402
+from accounts.models import Permission, ProfileType, User, UserProfile  # noqa: E402
+from accounts.schema import UserPageOut  # noqa: E402
+from accounts.tokens import issue_tokens  # noqa: E402
+from manipalapp.api import api  # noqa: E402
+from manipalapp.jwt import JWTAuth  # noqa: E402
+
+legacy_api = NinjaAPI(urls_namespace="bench-legacy", auth=JWTAuth(), csrf=False)
+
+
+@legacy_api.get("/users/", response=UserPageOut)
+@decorators.permission_required(PERMISSIONS.CAN_VIEW_USER)
+def legacy_list_users(request, limit: int = 50):
+    """The previous list_users page, kept here for comparison."""
+    page = list(User.objects.order_by("id").values("id", "email")[:limit + 1])
+    return {"items": page[:limit], "next": None}
+
+
+urlpatterns = [
+    path("legacy/", legacy_api.urls),
+    path("api/v1/", api.urls),
+]
+
+
+def seed(rows):
+    missing = rows - User.objects.count()
+    if missing > 0:
+        base = User.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        User.objects.bulk_create(
+            [
+                User(email=f"bench{n}@example.org", phone_number=f"8{n:09d}", password="!")
+                for n in range(base + 1, base + missing + 1)
+            ],
+            batch_size=2000,
+        )
+
+    permission, _ = Permission.objects.get_or_create(code=PERMISSIONS.CAN_VIEW_USER)
+    profile_type, _ = ProfileType.objects.get_or_create(type="bench-admin")
+    profile_type.permissions.add(permission)
+    user, _ = User.objects.get_or_create(email="bench-admin@example.org", defaults={"phone_number": "7000000000"})
+    UserProfile.objects.get_or_create(
+        user=user,
+        defaults={
+            "first_name": "bench", "last_name": "admin", "gender": "other",
+            "date_of_birth": "2000-01-01", "profile_type": profile_type,
+        },
+    )
+    return issue_tokens(user)["access"]
+
+
+def timed(client, url, token, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.content[:200]
+    return timings, json.loads(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    token = seed(args.rows)
+    accounts_api.USERS_PAGE_MAX_LIMIT = args.rows
+    client = Client()
+    results = {}
+    with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=["*"]):
+        for name, url in [
+            ("legacy", f"/legacy/users/?limit={args.rows}"),
+            ("orjson", f"/api/v1/accounts/users/?limit={args.rows}"),
+        ]:
+            timed(client, url, token, 2)  # warm up
+            timings, body = timed(client, url, token, args.repeat)
+            results[name] = body["items"]
+            print(f"{name:<7} {statistics.median(timings):>8.1f} ms/request (median)   rows={len(body['items'])}")
+
+    print("same items:", results["legacy"] == results["orjson"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+API middleware overhead benchmark.
+
+Pushes requests for a cheap API endpoint (no database or Redis) through Django's request
+handler with three middleware stacks: none at all, the previous full stack and the current
+MIDDLEWARE (browser middleware skipped under API_PATH_PREFIX). Reports microseconds per
+request and the overhead over the bare handler. No server or network needed.
+
+    python benchmarks/api_middleware.py --requests 20000 --path /api/v1/accounts/google/login/
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manipalapp.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.base import BaseHandler  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+# Django originals of the API-exempt classes in manipalapp.middleware
+ORIGINALS = {
+    "manipalapp.middleware.SessionMiddleware": "django.contrib.sessions.middleware.SessionMiddleware",
+    "manipalapp.middleware.CsrfViewMiddleware": "django.middleware.csrf.CsrfViewMiddleware",
+    "manipalapp.middleware.AuthenticationMiddleware": "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "manipalapp.middleware.MessageMiddleware": "django.contrib.messages.middleware.MessageMiddleware",
+    "manipalapp.middleware.XFrameOptionsMiddleware": "django.middleware.clickjacking.XFrameOptionsMiddleware",
+}
+# MIDDLEWARE as it would be without the API exemption
+FULL_MIDDLEWARE = [ORIGINALS.get(path, path) for path in settings.MIDDLEWARE]
+
+
+def run(name, middleware, path, requests, baseline=None):
+    with override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=["*"]):
+        handler = BaseHandler()
+        handler.load_middleware()
+        factory = RequestFactory()
+        for _ in range(200):  # warm up url resolving and lazy imports
+            handler.get_response(factory.get(path))
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = handler.get_response(factory.get(path))
+        elapsed = time.perf_counter() - start
+
+    per_request = elapsed / requests * 1e6
+    overhead = f"   +{per_request - baseline:.1f} us over bare" if baseline is not None else ""
+    print(f"{name:<8} {per_request:>8.1f} us/request   status={response.status_code}{overhead}")
+    return per_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--path", default=f"{settings.API_PATH_PREFIX}accounts/google/login/")
+    args = parser.parse_args()
+
+    bare = run("bare", [], args.path, args.requests)
+    run("full", FULL_MIDDLEWARE, args.path, args.requests, bare)
+    run("scoped", settings.MIDDLEWARE, args.path, args.requests, bare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+ASGI vs WSGI benchmark.
+
+Starts the app twice with the same number of gunicorn workers, once with sync workers
+(SERVER_MODE=wsgi) and once with uvicorn workers (SERVER_MODE=asgi, async endpoints), drives
+both with the same number of concurrent keep-alive clients and reports requests/sec and
+latency percentiles. Needs gunicorn, uvicorn, the database and the Redis from the environment.
+
+    python benchmarks/asgi_vs_wsgi.py --workers 2 --concurrency 200 --seconds 20 \
+        --path /api/v1/accounts/user/ --token <access token>
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    "wsgi": ["gunicorn", "manipalapp.wsgi:application"],
+    "asgi": ["gunicorn", "manipalapp.asgi:application", "--worker-class", "uvicorn.workers.UvicornWorker"],
+}
+
+
+def start_server(mode, port, workers):
+    env = dict(os.environ, SERVER_MODE=mode)
+    cmd = COMMANDS[mode] + ["--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/v1/docs")
+            conn.getresponse().read()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+def load(port, path, headers, concurrency, seconds):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine, failed = [], 0
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def report(mode, latencies, errors, seconds):
+    if not latencies:
+        print(f"{mode:<5} no successful requests ({errors} errors)")
+        return
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(
+        f"{mode:<5} {len(ms) / seconds:>10.0f} req/s   p50={statistics.median(ms):.1f}ms "
+        f"p99={p99:.1f}ms   errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers for both servers")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--path", default="/api/v1/accounts/user/")
+    parser.add_argument("--token", help="access token sent as a Bearer header")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", choices=sorted(COMMANDS), default=["wsgi", "asgi"])
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    for mode in args.modes:
+        proc = start_server(mode, args.port, args.workers)
+        try:
+            # Warm up connections, caches and prepared scripts before measuring
+            load(args.port, args.path, headers, args.concurrency, 2)
+            latencies, errors = load(args.port, args.path, headers, args.concurrency, args.seconds)
+        finally:
+            proc.terminate()
+            proc.wait()
+        report(mode, latencies, errors, args.seconds)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
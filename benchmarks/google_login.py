@@ -0,0 +1,173 @@
+"""
+Google login benchmark.
+
+Runs the outbound half of the Google OAuth callback (code exchange plus ID token
+verification) against a local stand-in for Google's token and certs endpoints, once the old
+way (a new connection per call and a certs download per login) and once through
+accounts.google_oauth (pooled session, cached certs, local verification). Reports logins/sec,
+p50/p99 latency and how many requests the stand-in served. --handshake-ms adds a delay to
+every new connection to stand in for the TLS handshake with Google. Needs the cache from
+the Django settings and the cryptography package to sign the stand-in's tokens.
+
+    python benchmarks/google_login.py --logins 500 --concurrency 8 --handshake-ms 30 --latency-ms 20
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manipalapp.settings")
+os.environ.setdefault("GOOGLE_OAUTH2_CLIENT_ID", "bench-client")
+
+KEY_ID = "bench-key"
+
+
+def make_key():
+    """RSA private key (PEM) and a self-signed cert (PEM) for the stand-in to sign with."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(1).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def start_stand_in(private_pem, cert_pem, client_id, handshake, latency, max_age):
+    from google.auth import crypt, jwt
+
+    signer = crypt.RSASigner.from_string(private_pem, key_id=KEY_ID)
+    counts = {"connections": 0, "token": 0, "certs": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients can reuse connections
+
+        def setup(self):
+            super().setup()
+            with lock:
+                counts["connections"] += 1
+            time.sleep(handshake)
+
+        def do_GET(self):
+            with lock:
+                counts["certs"] += 1
+            time.sleep(latency)
+            self._send({KEY_ID: cert_pem}, {"Cache-Control": f"public, max-age={max_age}"})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                counts["token"] += 1
+            time.sleep(latency)
+            now = int(time.time())
+            id_token = jwt.encode(signer, {
+                "iss": "https://accounts.google.com", "aud": client_id, "sub": "1",
+                "email": "bench@example.com", "iat": now, "exp": now + 3600,
+            })
+            self._send({"access_token": "x", "id_token": id_token.decode()}, {})
+
+        def _send(self, body, headers):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counts
+
+
+def run(name, login, logins, concurrency, counts):
+    for key in counts:
+        counts[key] = 0
+
+    def timed(_):
+        start = time.perf_counter()
+        login()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(x * 1000 for x in pool.map(timed, range(logins)))
+    elapsed = time.perf_counter() - start
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:<7} {logins / elapsed:>9.1f} logins/s   p50={statistics.median(latencies):.1f}ms "
+        f"p99={p99:.1f}ms   connections={counts['connections']} certs fetches={counts['certs']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--handshake-ms", type=float, default=30, help="delay per new connection")
+    parser.add_argument("--latency-ms", type=float, default=20, help="delay per request")
+    parser.add_argument("--max-age", type=int, default=3600, help="max-age the stand-in serves certs with")
+    args = parser.parse_args()
+
+    client_id = os.environ["GOOGLE_OAUTH2_CLIENT_ID"]
+    private_pem, cert_pem = make_key()
+    server, counts = start_stand_in(
+        private_pem, cert_pem, client_id, args.handshake_ms / 1000, args.latency_ms / 1000, args.max_age,
+    )
+    base = f"http://127.0.0.1:{server.server_port}"
+    os.environ["GOOGLE_OAUTH2_TOKEN_URL"] = f"{base}/token"
+    os.environ["GOOGLE_OAUTH2_CERTS_URL"] = f"{base}/certs"
+
+    import django
+    django.setup()
+
+    import requests
+    from django.core.cache import cache
+    from google.auth.transport import requests as google_requests
+    from google.oauth2 import id_token
+
+    from accounts import google_oauth
+
+    def legacy():
+        """The previous _google_identity, kept here for comparison."""
+        response = requests.post(f"{base}/token", data={"code": "bench"})
+        id_token.verify_token(
+            response.json()["id_token"], google_requests.Request(), client_id, certs_url=f"{base}/certs",
+        )
+
+    def pooled():
+        google_oauth.verify_id_token(google_oauth.exchange_code("bench")["id_token"])
+
+    cache.delete(google_oauth.CERTS_CACHE_KEY)
+    google_oauth.google_certs.clear()
+    run("legacy", legacy, args.logins, args.concurrency, counts)
+    run("pooled", pooled, args.logins, args.concurrency, counts)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
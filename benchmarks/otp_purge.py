@@ -0,0 +1,107 @@
+"""
+OTP retention benchmark (PostgreSQL).
+
+Loads a synthetic OtpVerification dataset spread over the last --days days, then runs
+purge_otp_challenges and reports rows/sec plus table and index sizes before and after.
+With --partitioned the table is converted to day partitions first, so the purge is
+mostly partition drops.
+
+Run it against a scratch database only: it purges every expired challenge in the table.
+
+    python benchmarks/otp_purge.py --rows 10000000 --days 30
+    python benchmarks/otp_purge.py --rows 10000000 --days 30 --partitioned
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manipalapp.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from accounts import partitions  # noqa: E402
+
+CHUNK = 500_000
+
+
+def load(table, rows, days):
+    qn = connection.ops.quote_name
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        for offset in range(0, rows, CHUNK):
+            cursor.execute(
+                f"""
+                INSERT INTO {qn(table)}
+                    (id, identifier, code_hash, salt, channel, expires_at, attempts, max_attempts, is_used, created_at)
+                SELECT md5(n::text || clock_timestamp()::text)::uuid,
+                       'bench-' || (n %% 200000),
+                       md5(n::text), left(md5(n::text), 32), 'sms',
+                       ts + interval '300 seconds', n %% 3, 5, n %% 4 <> 0, ts
+                FROM (
+                    SELECT n, now() - random() * (%s * interval '1 day') AS ts
+                    FROM generate_series(%s, %s) AS n
+                ) AS synthetic
+                """,
+                [days, offset, min(offset + CHUNK, rows) - 1],
+            )
+    elapsed = time.perf_counter() - start
+    print(f"loaded {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)")
+
+
+def sizes(table):
+    with connection.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE " + connection.ops.quote_name(table))
+        # Partitioned tables report nothing themselves, so sum over the table and its partitions
+        cursor.execute(
+            """
+            SELECT coalesce(sum(pg_table_size(relid)), 0), coalesce(sum(pg_indexes_size(relid)), 0)
+            FROM pg_partition_tree(%s)
+            """,
+            [table],
+        )
+        table_size, index_size = cursor.fetchone()
+        cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(table)}")
+        count = cursor.fetchone()[0]
+    return count, table_size, index_size
+
+
+def report(label, stats):
+    count, table_size, index_size = stats
+    print(f"{label:<7} rows={count:>10}  table={table_size / 2**20:>8.1f} MiB  indexes={index_size / 2**20:>8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--partitioned", action="store_true")
+    args = parser.parse_args()
+
+    table = partitions.otp_table()
+    if args.partitioned and not partitions.is_partitioned(table):
+        call_command("otp_partitions", convert=True, ahead=1)
+    if args.partitioned:
+        # Partitions for every day the synthetic data covers
+        call_command("otp_partitions", ahead=1)
+        today = timezone.now().date()
+        for n in range(args.days + 1):
+            partitions.create_day_partition(table, today - timedelta(days=n))
+
+    load(table, args.rows, args.days)
+    report("before", sizes(table))
+    call_command("purge_otp_challenges", batch_size=args.batch_size, sleep=0)
+    report("after", sizes(table))
+
+
+if __name__ == "__main__":
+    main()
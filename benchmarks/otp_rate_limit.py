@@ -0,0 +1,87 @@
+"""
+OTP rate limiter benchmark.
+
+Fires many concurrent requests for a single identifier at the Lua limiter and at the old
+get/get/set/set implementation, and reports requests/sec and how many requests each one let
+through. Only DAILY_REQUEST_LIMIT should ever pass. Needs the Redis from REDIS_URL.
+
+    python benchmarks/otp_rate_limit.py --callers 300 --requests 3000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manipalapp.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django_redis import get_redis_connection  # noqa: E402
+
+from service.otpservice.ratelimit import OtpRateLimiter  # noqa: E402
+
+
+def legacy_hit(cfg, identifier):
+    """The previous OtpService._check_and_increment_limits, kept here for comparison."""
+    cooldown_key = f"bench:legacy:cooldown:{identifier}"
+    daily_key = f"bench:legacy:daily:{identifier}"
+    if cache.get(cooldown_key):
+        raise ValueError("cooldown")
+    count = cache.get(daily_key, 0)
+    if count >= cfg["DAILY_REQUEST_LIMIT"]:
+        raise ValueError("limit")
+    cache.set(daily_key, count + 1, 60 * 60 * 24)
+    if cfg["RESEND_COOLDOWN"]:
+        cache.set(cooldown_key, 1, cfg["RESEND_COOLDOWN"])
+
+
+def run(name, hit, callers, requests):
+    def call(_):
+        try:
+            hit()
+            return True
+        except ValueError:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        allowed = sum(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {requests / elapsed:>10.0f} req/s   allowed={allowed}")
+    return allowed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=300, help="concurrent threads")
+    parser.add_argument("--requests", type=int, default=3000, help="total requests")
+    parser.add_argument("--limit", type=int, default=20, help="DAILY_REQUEST_LIMIT to enforce")
+    parser.add_argument("--cooldown", type=int, default=0,
+                        help="RESEND_COOLDOWN; 0 (default) so only the window limit is exercised")
+    args = parser.parse_args()
+
+    # A pool big enough for every caller, otherwise the benchmark measures pool contention
+    get_redis_connection("default").connection_pool.max_connections = max(args.callers, 50)
+
+    cfg = {"DAILY_REQUEST_LIMIT": args.limit, "RESEND_COOLDOWN": args.cooldown}
+    identifier = f"bench-{uuid.uuid4().hex}"
+    limiter = OtpRateLimiter(cfg)
+
+    print(f"{args.requests} requests, {args.callers} concurrent callers, limit {args.limit}")
+    lua = run("lua", lambda: limiter.hit(identifier), args.callers, args.requests)
+    legacy = run("legacy", lambda: legacy_hit(cfg, identifier), args.callers, args.requests)
+
+    print(f"lua overshoot: {lua - args.limit}, legacy overshoot: {legacy - args.limit}")
+    get_redis_connection("default").delete(limiter._cooldown_key(identifier), limiter._window_key(identifier))
+    cache.delete_many([f"bench:legacy:cooldown:{identifier}", f"bench:legacy:daily:{identifier}"])
+    sys.exit(0 if lua <= args.limit else 1)
+
+
+if __name__ == "__main__":
+    main()
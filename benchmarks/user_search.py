@@ -0,0 +1,117 @@
+"""
+User search benchmark (PostgreSQL).
+
+Loads --users synthetic users with profiles, then times accounts.search against the
+ILIKE '%term%' scan the admin used to run, for a handful of email, phone and name terms.
+Prints the plan of the indexed lookup so a sequential scan is easy to spot.
+
+Run it against a scratch, migrated database only: it inserts rows into the user tables.
+
+    python benchmarks/user_search.py --users 1000000
+    python benchmarks/user_search.py --users 0 --repeat 50   # reuse the rows already loaded
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manipalapp.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from accounts import search  # noqa: E402
+from accounts.models import User, UserProfile  # noqa: E402
+
+CHUNK = 200_000
+FIRST_NAMES = ["aarav", "diya", "rohan", "ananya", "vikram", "meera", "kabir", "isha", "arjun", "sara"]
+LAST_NAMES = ["sharma", "patel", "nair", "iyer", "reddy", "menon", "gupta", "rao", "shetty", "kapoor"]
+TERMS = ["meera", "menon", "kabir rao", "isha.shetty", "98765", "example.org", "zzzqqq"]
+
+
+def load(users):
+    qn = connection.ops.quote_name
+    user_table = qn(User._meta.db_table)
+    profile_table = qn(UserProfile._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT coalesce(max(id), 0) FROM {user_table}")
+        base = cursor.fetchone()[0]
+        start = time.perf_counter()
+        for offset in range(0, users, CHUNK):
+            cursor.execute(
+                f"""
+                WITH synthetic AS (
+                    SELECT n,
+                           (%s::text[])[1 + n %% 10] AS first_name,
+                           (%s::text[])[1 + (n / 10) %% 10] AS last_name
+                    FROM generate_series(%s, %s) AS n
+                ), new_users AS (
+                    INSERT INTO {user_table} (
+                        password, is_superuser, email, is_email_verified, phone_number, auth_provider,
+                        is_active, is_deleted, is_staff, date_joined, created_at, updated_at
+                    )
+                    SELECT '!', false, first_name || '.' || last_name || n || '@example.org', false,
+                           '9' || lpad(n::text, 9, '0'), 'phone', true, false, false, now(), now(), now()
+                    FROM synthetic
+                    RETURNING id, phone_number
+                )
+                INSERT INTO {profile_table} (
+                    user_id, first_name, last_name, gender, date_of_birth, is_referred, created_at, updated_at
+                )
+                SELECT u.id, s.first_name, s.last_name, 'other', date '1990-01-01', false, now(), now()
+                FROM new_users u JOIN synthetic s ON u.phone_number = '9' || lpad(s.n::text, 9, '0')
+                """,
+                [FIRST_NAMES, LAST_NAMES, base + offset, base + min(offset + CHUNK, users) - 1],
+            )
+        cursor.execute(f"ANALYZE {user_table}")
+        cursor.execute(f"ANALYZE {profile_table}")
+    elapsed = time.perf_counter() - start
+    print(f"loaded {users} users in {elapsed:.1f}s ({users / elapsed:.0f} users/s)")
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples), max(samples)
+
+
+def ilike_scan(term):
+    # What UserAdmin.search_fields = ["email", "phone_number"] used to generate; names were not searchable
+    return list(User.objects.filter(Q(email__icontains=term) | Q(phone_number__icontains=term))
+                .order_by("id").values_list("id", flat=True)[:20])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--explain", action="store_true", help="print the plan of each indexed lookup")
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        sys.exit("The search benchmark needs PostgreSQL with pg_trgm")
+    if args.users:
+        load(args.users)
+
+    print(f"{'term':<14} {'indexed p50':>12} {'max':>9} {'hits':>5}   {'ILIKE p50':>10} {'max':>9} {'hits':>5}")
+    for term in TERMS:
+        hits, p50, worst = timed(lambda: search.find_users(term, args.limit), args.repeat)
+        scan_hits, scan_p50, scan_worst = timed(lambda: ilike_scan(term), args.repeat)
+        print(f"{term:<14} {p50:>10.1f}ms {worst:>7.1f}ms {len(hits):>5}   "
+              f"{scan_p50:>8.1f}ms {scan_worst:>7.1f}ms {len(scan_hits):>5}")
+        if args.explain:
+            print(User.objects.filter(id__in=search.matching_ids(term)).explain(analyze=True))
+
+
+if __name__ == "__main__":
+    main()
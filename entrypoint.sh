@@ -19,8 +19,20 @@ python manage.py migrate --noinput
 # # Start the Django background tasks in a separate thread
 # run_process_tasks
 
-# Start uvicorn as the main process
+# Workers write API metrics here and /metrics aggregates them (see manipalapp.metrics);
+# start from an empty directory so samples of a previous run don't leak in
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Start gunicorn as the main process: sync workers by default, uvicorn workers (and the async
+# endpoints, see ASGI_MODE in settings) with SERVER_MODE=asgi
+WORKERS="${WEB_CONCURRENCY:-2}"
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    echo "Starting gunicorn server (ASGI, uvicorn workers)..."
+    exec gunicorn manipalapp.asgi:application --bind 0.0.0.0:8000 --workers "$WORKERS" \
+        --worker-class uvicorn.workers.UvicornWorker
+fi
 echo "Starting gunicorn server..."
-exec gunicorn manipalapp.wsgi:application --bind 0.0.0.0:8000 --workers 2 
-# --worker-class uvicorn.workers.UvicornWorker
+exec gunicorn manipalapp.wsgi:application --bind 0.0.0.0:8000 --workers "$WORKERS"
 exec "$@"
\ No newline at end of file
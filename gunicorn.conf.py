@@ -0,0 +1,7 @@
+# Loaded by gunicorn from the working directory (see entrypoint.sh)
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop the live-gauge files of a worker that exited; its counters and histograms are kept
+    multiprocess.mark_process_dead(worker.pid)
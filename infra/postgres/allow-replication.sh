@@ -0,0 +1,5 @@
+#!/bin/bash
+# Lets the replica in docker-compose.yml stream from this server. Only runs when the data
+# directory is initialised, add the line to pg_hba.conf by hand for an existing one.
+set -e
+echo "host replication $POSTGRES_USER all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
 from ninja import NinjaAPI
 from django.contrib.auth.decorators import login_required
 from accounts.api import app as accounts_router
@@ -20,6 +22,8 @@ api = NinjaAPI(
     openapi_url="openapi.json",
     auth=JWTAuth(),
     csrf=False,  # Disable CSRF for API endpoints
+    renderer=import_string(settings.API_RENDERER)(),
+    parser=import_string(settings.API_PARSER)(),
     openapi_extra={
         "components": {
             "securitySchemes": {
@@ -0,0 +1,25 @@
+import asyncio
+import weakref
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+from manipalapp.metrics import InstrumentedAsyncRedis
+
+
+# event loop -> {cache alias: client}
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis(alias: str = "default") -> aioredis.Redis:
+    """
+    redis.asyncio client for the Redis server behind CACHES[alias], the async counterpart
+    of django_redis.get_redis_connection. Connections belong to the event loop that opened
+    them, so every running loop gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    per_loop = _clients.setdefault(loop, {})
+    client = per_loop.get(alias)
+    if client is None:
+        client = per_loop[alias] = InstrumentedAsyncRedis.from_url(settings.CACHES[alias]["LOCATION"])
+    return client
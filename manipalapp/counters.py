@@ -0,0 +1,103 @@
+import uuid
+from typing import Callable
+
+from django_redis import get_redis_connection
+from redis.exceptions import LockNotOwnedError
+
+
+# Moves the pending hash under its batch key and records the batch as in flight, atomically,
+# so no increment lands between the two. KEYS[1] pending hash, KEYS[2] batch hash,
+# KEYS[3] in-flight set, ARGV[1] batch id. Returns 0 when there was nothing pending.
+CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('SADD', KEYS[3], ARGV[1])
+return 1
+"""
+
+
+class CounterBuffer:
+    """
+    Write-behind counters for events too frequent to UPDATE a row each time.
+
+    incr() is one HINCRBY on counters:<name>. flush() claims the whole hash as a batch,
+    passes the totals to `apply(batch_id, {field: total})` and deletes the batch once that
+    returns; increments arriving meanwhile go to a fresh hash. A flush that dies midway
+    leaves its batch in counters:<name>:batches and the next flush re-applies it first.
+    Delivery is therefore at-least-once: `apply` must skip a batch id it already committed,
+    atomically (see PointsService.award_counts), since a flush outliving lock_seconds can
+    overlap the next one.
+    """
+
+    def __init__(self, name: str, apply: Callable[[str, dict], None], lock_seconds: int = 60,
+                 alias: str = "default"):
+        self.name = name
+        self.apply = apply
+        self.lock_seconds = lock_seconds
+        self.alias = alias
+        self._script = None
+
+    @property
+    def redis(self):
+        return get_redis_connection(self.alias)
+
+    def _pending_key(self) -> str:
+        return f"counters:{self.name}"
+
+    def _batches_key(self) -> str:
+        return f"counters:{self.name}:batches"
+
+    def _batch_key(self, batch_id: str) -> str:
+        return f"counters:{self.name}:batch:{batch_id}"
+
+    def _get_script(self):
+        if self._script is None:
+            self._script = self.redis.register_script(CLAIM_SCRIPT)
+        return self._script
+
+    def incr(self, field: str, amount: int = 1) -> None:
+        self.redis.hincrby(self._pending_key(), field, amount)
+
+    def flush(self) -> int:
+        """Apply leftover batches, then everything pending. Returns the number of fields applied."""
+        # One flusher at a time, otherwise two could replay the same leftover batch together
+        lock = self.redis.lock(f"counters:{self.name}:lock", timeout=self.lock_seconds)
+        if not lock.acquire(blocking=False):
+            return 0
+        applied = 0
+        try:
+            for batch_id in sorted(m.decode() for m in self.redis.smembers(self._batches_key())):
+                applied += self._apply_batch(batch_id)
+                # Restart the lock's timeout for the next batch; raises once it was lost
+                lock.reacquire()
+
+            batch_id = uuid.uuid4().hex
+            claimed = self._get_script()(
+                keys=[self._pending_key(), self._batch_key(batch_id), self._batches_key()],
+                args=[batch_id],
+            )
+            if claimed:
+                applied += self._apply_batch(batch_id)
+        except LockNotOwnedError:
+            # Held longer than lock_seconds, another flusher may have taken over: stop here.
+            # `apply` skips a batch committed twice, the next flush picks up the rest
+            pass
+        finally:
+            try:
+                lock.release()
+            except LockNotOwnedError:
+                pass  # expired during the last batch, nothing left to release
+        return applied
+
+    def _apply_batch(self, batch_id: str) -> int:
+        key = self._batch_key(batch_id)
+        counts = {field.decode(): int(total) for field, total in self.redis.hgetall(key).items()}
+        if counts:
+            self.apply(batch_id, counts)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.srem(self._batches_key(), batch_id)
+        pipe.execute()
+        return len(counts)
@@ -0,0 +1,135 @@
+import inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Read-replica routing. Reads go to the replica only inside use_replica()/read_replica, every
+# other query (and everything outside a request) stays on the primary. A user who wrote in a
+# request is pinned to the primary for PIN_SECONDS so they never read their own stale data.
+
+REPLICA_SETTINGS = settings.DATABASE_REPLICA_SETTINGS
+REPLICA_DB_ALIAS = REPLICA_SETTINGS["ALIAS"]
+
+_use_replica = ContextVar("use_replica", default=False)
+# Per request {"wrote": bool}, mutated in place so writes made in sync_to_async threads count
+_request_state = ContextVar("db_request_state", default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id) -> str:
+    return f"db:pinned:{user_id}"
+
+
+def pin_to_primary(user_id) -> None:
+    cache.set(_pin_key(user_id), 1, REPLICA_SETTINGS["PIN_SECONDS"])
+
+
+def is_pinned(user_id) -> bool:
+    return cache.get(_pin_key(user_id)) is not None
+
+
+@contextmanager
+def use_replica():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_replica(view_func):
+    """Serve a read-only view from the replica unless its user wrote within PIN_SECONDS."""
+    def should_use_replica(request):
+        user_id = getattr(getattr(request, "auth", None), "pk", None)
+        return replica_configured() and not (user_id and is_pinned(user_id))
+
+    if inspect.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if not await sync_to_async(should_use_replica)(request):
+                return await view_func(request, *args, **kwargs)
+            with use_replica():
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not should_use_replica(request):
+            return view_func(request, *args, **kwargs)
+        with use_replica():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if _use_replica.get() and not (state and state["wrote"]) and replica_configured():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state["wrote"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinningMiddleware:
+    """Pins users who wrote through the ORM during a request to the primary (see read_replica)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = {"wrote": False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        user_id = self._writer(request, state)
+        if user_id:
+            pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        state = {"wrote": False}
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        user_id = self._writer(request, state)
+        if user_id:
+            await sync_to_async(pin_to_primary)(user_id)
+        return response
+
+    def _writer(self, request, state):
+        if not state["wrote"] or not replica_configured():
+            return None
+        # The JWT user, set by ninja once the request is authenticated
+        return getattr(getattr(request, "auth", None), "pk", None)
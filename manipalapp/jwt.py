@@ -1,15 +1,53 @@
 from ninja.security import HttpBearer
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts import user_cache
+
+# Stateless, safe to share between requests
+jwt_authentication = JWTAuthentication()
+
+
+def _validate(token):
+    """The validated token and its user id, or (None, None)."""
+    try:
+        validated_token = jwt_authentication.get_validated_token(token)
+    except (InvalidToken, TokenError):
+        return None, None
+    return validated_token, validated_token.get(api_settings.USER_ID_CLAIM)
+
+
+def _attach(request, user, validated_token):
+    # request.auth = user
+    request.user = user
+    # Kept for permission_required, which can authorize from its claims
+    request.auth_token = validated_token
+    return user
+
 
 class JWTAuth(HttpBearer):
     def authenticate(self, request, token):
-        try:
-            validated_token = JWTAuthentication().get_validated_token(token)
-            user = JWTAuthentication().get_user(validated_token)
-            # request.auth = user
-            request.user = user
-            return user
-        except (InvalidToken, TokenError):
+        validated_token, user_id = _validate(token)
+        if user_id is None:
+            return None
+
+        # Served from the two-level user cache; a hot user costs no DB query here
+        user = user_cache.get_user(user_id)
+        if user is None:
+            return None
+        return _attach(request, user, validated_token)
+
+
+class AsyncJWTAuth(HttpBearer):
+    """JWTAuth for async operations: the user cache is read without blocking the event loop."""
+
+    async def authenticate(self, request, token):
+        validated_token, user_id = _validate(token)
+        if user_id is None:
+            return None
+
+        user = await user_cache.aget_user(user_id)
+        if user is None:
             return None
+        return _attach(request, user, validated_token)
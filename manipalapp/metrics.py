@@ -0,0 +1,229 @@
+import os
+import random
+import time
+from contextvars import ContextVar
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+
+# Per-operation API metrics, exported in the Prometheus text format by metrics_view.
+#
+# Latency, status and response size are recorded for every API request. DB queries, Redis
+# calls and cache lookups need a hook on every call, so they are only collected for a
+# SAMPLE_RATE share of requests. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (entrypoint.sh
+# does) so every worker writes its samples to a shared directory that /metrics aggregates.
+
+METRICS_SETTINGS = settings.METRICS_SETTINGS
+API_PATH_PREFIX = settings.API_PATH_PREFIX
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CALL_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_SECONDS = Histogram(
+    "api_request_duration_seconds", "API request latency", ["operation", "status"], buckets=LATENCY_BUCKETS,
+)
+RESPONSE_BYTES = Histogram(
+    "api_response_size_bytes", "API response body size", ["operation"], buckets=SIZE_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "api_db_queries", "DB queries per sampled request", ["operation"], buckets=CALL_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    "api_db_duration_seconds", "DB time per sampled request", ["operation"], buckets=LATENCY_BUCKETS,
+)
+REDIS_CALLS = Histogram(
+    "api_redis_calls", "Redis round trips per sampled request", ["operation"], buckets=CALL_BUCKETS,
+)
+REDIS_SECONDS = Histogram(
+    "api_redis_duration_seconds", "Redis time per sampled request", ["operation"], buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "api_cache_lookups", "Cache lookups in sampled requests", ["operation", "cache", "result"],
+)
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds", "redis_calls", "redis_seconds", "cache")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.redis_calls = 0
+        self.redis_seconds = 0.0
+        self.cache = {}  # (cache, "hit" | "miss") -> count
+
+
+# Stats of the sampled request being served; copied into sync_to_async threads with the context
+_stats = ContextVar("request_stats", default=None)
+
+
+def record_cache(cache_name: str, hit: bool) -> None:
+    stats = _stats.get()
+    if stats is not None:
+        key = (cache_name, "hit" if hit else "miss")
+        stats.cache[key] = stats.cache.get(key, 0) + 1
+
+
+# ---- DB ----
+def _db_wrapper(execute, sql, params, many, context):
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def _install_db_wrapper(sender, connection, **kwargs):
+    # Connections are per thread, hooking them as they open covers the async ORM's threads too
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+connection_created.connect(_install_db_wrapper)
+
+
+# ---- Redis ----
+def _redis_done(stats, start) -> None:
+    stats.redis_calls += 1
+    stats.redis_seconds += time.perf_counter() - start
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        stats = _stats.get()
+        if stats is None:
+            return super().execute(raise_on_error)
+        start = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            _redis_done(stats, start)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Client class for django-redis (OPTIONS["REDIS_CLIENT_CLASS"]) that counts round trips."""
+
+    def execute_command(self, *args, **options):
+        stats = _stats.get()
+        if stats is None:
+            return super().execute_command(*args, **options)
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            _redis_done(stats, start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedAsyncPipeline(aioredis.client.Pipeline):
+    async def execute(self, raise_on_error=True):
+        stats = _stats.get()
+        if stats is None:
+            return await super().execute(raise_on_error)
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            _redis_done(stats, start)
+
+
+class InstrumentedAsyncRedis(aioredis.Redis):
+    async def execute_command(self, *args, **options):
+        stats = _stats.get()
+        if stats is None:
+            return await super().execute_command(*args, **options)
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            _redis_done(stats, start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+# ---- middleware and endpoint ----
+class MetricsMiddleware:
+    """Records the metrics above for requests under API_PATH_PREFIX, labelled by route and method."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path_info.startswith(API_PATH_PREFIX):
+            return self.get_response(request)
+        stats, token = self._start()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        self._observe(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not request.path_info.startswith(API_PATH_PREFIX):
+            return await self.get_response(request)
+        stats, token = self._start()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stats.reset(token)
+        self._observe(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def _start(self):
+        sample_rate = METRICS_SETTINGS["SAMPLE_RATE"]
+        stats = RequestStats() if sample_rate >= 1 or random.random() < sample_rate else None
+        return stats, _stats.set(stats)
+
+    def _observe(self, request, response, stats, seconds):
+        match = request.resolver_match
+        # The route pattern, never the raw path, to keep label cardinality bounded
+        operation = f"{request.method} /{match.route}" if match else "unmatched"
+        REQUEST_SECONDS.labels(operation, str(response.status_code)).observe(seconds)
+        if not response.streaming:
+            RESPONSE_BYTES.labels(operation).observe(len(response.content))
+        if stats is None:
+            return
+        DB_QUERIES.labels(operation).observe(stats.db_queries)
+        DB_SECONDS.labels(operation).observe(stats.db_seconds)
+        REDIS_CALLS.labels(operation).observe(stats.redis_calls)
+        REDIS_SECONDS.labels(operation).observe(stats.redis_seconds)
+        for (cache_name, result), count in stats.cache.items():
+            CACHE_LOOKUPS.labels(operation, cache_name, result).inc(count)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, aggregated over all workers in multiprocess mode."""
+    token = METRICS_SETTINGS["TOKEN"]
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,50 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over big tables. Above `threshold` rows the count comes
+    from PostgreSQL's statistics instead of COUNT(*): pg_class.reltuples for a whole table,
+    the planner's row estimate for a filtered queryset. Smaller results are counted exactly.
+    The page count is approximate, so the last pages may come back short or empty.
+    """
+
+    threshold = 100_000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is None or estimate < self.threshold:
+            return super().count
+        return estimate
+
+    def estimated_count(self):
+        qs = self.object_list
+        if not isinstance(qs, QuerySet):
+            return None
+        connection = connections[qs.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        with connection.cursor() as cursor:
+            if not qs.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                    [qs.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                # -1 until the first ANALYZE, and always for a partitioned parent
+                if row is not None and row[0] >= 0:
+                    return row[0]
+
+            sql, params = qs.order_by().query.sql_with_params()
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,61 @@
+from functools import partial
+
+import orjson
+from django.conf import settings
+from django.http import HttpResponse
+from ninja.parser import Parser
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+
+# JSON for the Ninja API: orjson renderer and parser (see API_RENDERER / API_PARSER in
+# settings), building response schemas from trusted ORM data without re-running validators,
+# and writing large lists straight from values_list() rows.
+
+_encoder = NinjaJSONEncoder()
+
+# Datetimes go through Django's encoder so their format doesn't change (millisecond
+# precision, "Z" for UTC); orjson calls _encoder.default for them and for anything it
+# doesn't know (Decimal, lazy strings, pydantic Url...)
+DUMPS_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(data) -> bytes:
+    return orjson.dumps(data, default=_encoder.default, option=DUMPS_OPTIONS)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+
+    def render(self, request, data, *, response_status):
+        return dumps(data)
+
+
+class ORJSONParser(Parser):
+    def parse_body(self, request):
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, ninja handles both alike
+        return orjson.loads(request.body)
+
+
+def construct(schema, obj):
+    """
+    `schema` instance from an ORM object or dict. With API_TRUSTED_OUTPUT the fields are
+    copied with model_construct, skipping validators (EmailStr and friends) for data that
+    came out of our own database; ninja accepts the instance as is.
+    """
+    if not settings.API_TRUSTED_OUTPUT:
+        return schema.model_validate(obj)
+    get = obj.get if isinstance(obj, dict) else partial(getattr, obj)
+    return schema.model_construct(**{name: get(name) for name in schema.model_fields})
+
+
+def rows_response(fields, rows, **extra) -> HttpResponse:
+    """{"items": [...], **extra} as a JSON response built from values_list() rows, no schema involved."""
+    items = [dict(zip(fields, row)) for row in rows]
+    return HttpResponse(dumps({"items": items, **extra}), content_type="application/json")
+
+
+def ndjson_lines(fields, rows):
+    """One JSON object per values_list() row, for StreamingHttpResponse."""
+    for row in rows:
+        yield dumps(dict(zip(fields, row))) + b"\n"
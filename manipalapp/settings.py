@@ -33,6 +33,12 @@ DEBUG = True
 
 AUTH_USER_MODEL = 'accounts.User'
 
+# phone_number is unique among live users only: a partial unique index, see accounts.User.Meta.
+# The auth check ignores conditional constraints. Username lookups only go through
+# UserManager, which hides deleted users, so the live-only index is enough. accounts.checks
+# replaces E003 and fails if the index or the manager changes.
+SILENCED_SYSTEM_CHECKS = ["auth.E003"]
+
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -55,6 +61,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
      
     #third party apps
     'rest_framework',
@@ -67,19 +74,50 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'manipalapp.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'manipalapp.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    
+    'manipalapp.middleware.CsrfViewMiddleware',
+    'manipalapp.middleware.AuthenticationMiddleware',
+    'manipalapp.middleware.MessageMiddleware',
+    'manipalapp.middleware.XFrameOptionsMiddleware',
+    'manipalapp.db_router.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'manipalapp.urls'
 
+# JWT-only API (Ninja and the simplejwt views): the manipalapp.middleware classes above skip
+# sessions, CSRF, auth, messages and X-Frame-Options under this prefix
+API_PATH_PREFIX = "/api/v1/"
+
+# JSON for the Ninja API (ninja.renderers.JSONRenderer / ninja.parser.Parser are the stdlib
+# json defaults). Trusted output builds response schemas from our own rows without
+# re-running their validators (see manipalapp.serialization).
+API_RENDERER = "manipalapp.serialization.ORJSONRenderer"
+API_PARSER = "manipalapp.serialization.ORJSONParser"
+API_TRUSTED_OUTPUT = True
+
+# Per-operation API metrics served at /metrics (see manipalapp.metrics)
+METRICS_SETTINGS = {
+    "SAMPLE_RATE": float(os.getenv("METRICS_SAMPLE_RATE", "0.1")),  # share of requests with DB/Redis/cache detail
+    "TOKEN": os.getenv("METRICS_TOKEN"),  # bearer token required by /metrics when set
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "accounts": {"handlers": ["console"], "level": os.getenv("APP_LOG_LEVEL", "INFO")},
+        "service": {"handlers": ["console"], "level": os.getenv("APP_LOG_LEVEL", "INFO")},
+        "manipalapp": {"handlers": ["console"], "level": os.getenv("APP_LOG_LEVEL", "INFO")},
+    },
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -96,6 +134,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'manipalapp.wsgi.application'
+ASGI_APPLICATION = 'manipalapp.asgi.application'
+
+# "asgi" when served by uvicorn workers (see entrypoint.sh): the I/O heavy endpoints in
+# accounts.api are then registered in their async versions
+ASGI_MODE = os.getenv("SERVER_MODE", "wsgi").lower() == "asgi"
 
 
 # Database
@@ -109,7 +152,27 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        # Keep connections open between requests (checked before reuse). Async requests
+        # don't reuse connections, put pgbouncer in front of Postgres in ASGI mode.
+        "CONN_MAX_AGE": 0 if ASGI_MODE else int(os.getenv("DB_CONN_MAX_AGE", "300")),
+        "CONN_HEALTH_CHECKS": True,
+    }
+}
+
+# Streaming replica for read-only endpoints (see manipalapp.db_router), same credentials
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "PORT": os.getenv("DB_REPLICA_PORT", os.getenv("DB_PORT")),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["manipalapp.db_router.ReplicaRouter"]
+
+DATABASE_REPLICA_SETTINGS = {
+    "ALIAS": "replica",
+    "PIN_SECONDS": 5,   # reads stay on the primary this long after a user writes (> replica lag)
 }
 
 
@@ -165,6 +228,8 @@ CACHES = {
         "LOCATION": REDIS_URL,  # DB 1
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # Counts Redis round trips for the API metrics (see manipalapp.metrics)
+            "REDIS_CLIENT_CLASS": "manipalapp.metrics.InstrumentedRedis",
         }
     }
 }
@@ -181,12 +246,28 @@ SIMPLE_JWT = {
     "TOKEN_TYPE_CLAIM": "token_type",
     "JTI_CLAIM": "jti",
     "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.tokens.PermissionClaimsTokenObtainPairSerializer",
 }
 
+# Put profile type and permission bitmask claims on access tokens so permission_required
+# can authorize without loading permissions (see accounts.tokens)
+JWT_PERMISSION_CLAIMS = os.getenv("JWT_PERMISSION_CLAIMS", "false").lower() == "true"
+
 # Google OAuth2 settings
 GOOGLE_OAUTH2_CLIENT_ID = os.getenv('GOOGLE_OAUTH2_CLIENT_ID')
 GOOGLE_OAUTH2_CLIENT_SECRET = os.getenv('GOOGLE_OAUTH2_CLIENT_SECRET')
 GOOGLE_OAUTH2_REDIRECT_URI = os.getenv('GOOGLE_OAUTH2_REDIRECT_URI', 'http://localhost:8000/api/v1/accounts/google/callback/')
+GOOGLE_OAUTH2_SETTINGS = {
+    # Overridable so the login flow can run against a local stand-in (benchmarks/google_login.py)
+    "TOKEN_URL": os.getenv("GOOGLE_OAUTH2_TOKEN_URL", "https://oauth2.googleapis.com/token"),
+    "CERTS_URL": os.getenv("GOOGLE_OAUTH2_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs"),
+    "CONNECT_TIMEOUT_SECONDS": 3,
+    "READ_TIMEOUT_SECONDS": 5,
+    "POOL_SIZE": 10,                # kept-alive connections per host and process
+    "CERTS_DEFAULT_MAX_AGE": 3600,  # when Google's response has no Cache-Control max-age
+    "CERTS_REFRESH_COOLDOWN": 60,   # seconds between forced refreshes for unknown key ids
+    "CLOCK_SKEW_SECONDS": 10,
+}
 
 
 # OTP settings
@@ -196,4 +277,49 @@ OTP_LOGIN_SETTINGS = {
     "MAX_ATTEMPTS": 5,
     "RESEND_COOLDOWN": 45,      # seconds between requests
     "DAILY_REQUEST_LIMIT": 20,
-}
\ No newline at end of file
+    "CHALLENGE_STORE": "orm",   # "orm" (OtpVerification rows) or "redis"
+    "AUDIT_BATCH_SIZE": 200,    # redis store: OtpVerification audit rows per write-behind batch
+    "AUDIT_FLUSH_SECONDS": 2,
+    "RETENTION_HOURS": 24,      # purge_otp_challenges keeps expired challenges this long
+}
+
+# OTP delivery (service.otpservice.dispatcher.QueuedOtpDispatcher)
+OTP_DELIVERY_SETTINGS = {
+    "ASYNC": os.getenv("OTP_ASYNC_DELIVERY", "false").lower() == "true",
+    "QUEUE_SIZE": 10000,            # per channel, request_otp fails fast when full
+    "BATCH_SIZE": 50,
+    "BATCH_WAIT_SECONDS": 0.05,     # how long a worker waits for a batch to fill
+    "MAX_RETRIES": 3,
+    "RETRY_BACKOFF_SECONDS": 0.5,   # doubled on every retry
+    "CONCURRENCY": {"sms": 4, "email": 2},  # worker threads, i.e. in-flight provider calls per channel
+}
+
+
+# Authenticated user cache (manipalapp.jwt.JWTAuth)
+USER_CACHE_SETTINGS = {
+    "LOCAL_MAX_SIZE": 2048,     # users kept in each worker's LRU
+    "LOCAL_TTL_SECONDS": 5,     # short, other workers only see invalidations once this expires
+    "REDIS_TTL_SECONDS": 300,
+    "GENERATION_TTL_SECONDS": 86400,  # per-user token that invalidations delete, outlives the entries
+}
+
+
+# Compiled permission sets (accounts.decorators.permission_required)
+PERMISSION_CACHE_SETTINGS = {
+    "VERSION_CHECK_SECONDS": 5,  # how stale a worker's in-memory sets may get
+    "REDIS_TTL_SECONDS": 60 * 60 * 24,
+}
+
+
+# Soft-deleted users (accounts archive_deleted_users)
+USER_ARCHIVE_SETTINGS = {
+    "RETENTION_DAYS": 90,   # deleted users stay in accounts_user this long before being archived
+    "BATCH_SIZE": 500,
+}
+
+
+# Write-behind counters (manipalapp.counters.CounterBuffer, flushed by flush_counters)
+COUNTER_BUFFER_SETTINGS = {
+    "FLUSH_INTERVAL_SECONDS": 5,
+    "LOCK_SECONDS": 60,     # a flush running longer than this may overlap with the next one
+}
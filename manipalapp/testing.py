@@ -0,0 +1,85 @@
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+# Query budgets for tests: fail when a block runs more queries than declared, or when the same
+# query shape repeats more than max_repeats times (the N+1 signature). Works on every backend
+# Django captures queries for, PostgreSQL and SQLite alike.
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_VALUE_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_SPACE = re.compile(r"\s+")
+# Transaction control isn't work done by the code under test
+_TRANSACTION = re.compile(r"^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT|BEGIN|COMMIT|ROLLBACK)\b", re.I)
+
+
+def normalize_sql(sql: str) -> str:
+    """Query shape: literals become ?, IN/VALUES lists collapse to (...), whitespace is squeezed."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _VALUE_LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def ninja_routes(router) -> set:
+    """(method, path) of every operation registered on a Ninja router."""
+    return {
+        (method, path)
+        for path, path_view in router.path_operations.items()
+        for operation in path_view.operations
+        for method in operation.methods
+    }
+
+
+class QueryReport:
+    def __init__(self):
+        self.queries = []
+
+    def repeated(self, max_repeats: int) -> dict:
+        """Normalized queries seen more than max_repeats times, with their counts."""
+        counts = Counter(normalize_sql(sql) for sql in self.queries)
+        return {shape: count for shape, count in counts.items() if count > max_repeats}
+
+    def __len__(self):
+        return len(self.queries)
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: int = 2, using=None):
+    """
+    Assert that the block runs at most max_queries queries (over every database alias, or
+    just `using`, one alias or several) and no query shape more than max_repeats times.
+    Yields a QueryReport that is filled in when the block exits.
+    """
+    aliases = [using] if isinstance(using, str) else list(using or connections)
+    report = QueryReport()
+    with ExitStack() as stack:
+        contexts = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in aliases]
+        yield report
+
+    report.queries = [
+        query["sql"]
+        for context in contexts
+        for query in context.captured_queries
+        if not _TRANSACTION.match(query["sql"])
+    ]
+    problems = []
+    if len(report) > max_queries:
+        problems.append(f"{len(report)} queries, budget is {max_queries}")
+    for shape, count in report.repeated(max_repeats).items():
+        problems.append(f"possible N+1, {count}x: {shape}")
+    if problems:
+        listing = "\n".join(f"{i}. {sql}" for i, sql in enumerate(report.queries, start=1))
+        raise AssertionError("\n".join(problems) + "\nCaptured queries:\n" + listing)
+
+
+class QueryBudgetMixin:
+    """TestCase mixin: `with self.assertQueryBudget(3): ...` over the test's own databases."""
+
+    def assertQueryBudget(self, max_queries: int, max_repeats: int = 2, using=None):
+        return query_budget(max_queries, max_repeats=max_repeats, using=using or self.databases)
@@ -22,6 +22,7 @@ from manipalapp.api import api
 from .view import home_view
 from accounts.token_view import jwt_urlpatterns
 from accounts.views import login_view
+from manipalapp.metrics import metrics_view
 
 
 # Add router 
@@ -31,6 +32,7 @@ urlpatterns = [
     path("", home_view),
     path("login/", login_view, name="login"),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view),  # Prometheus scrape endpoint
     path("api/v1/", api.urls),# Ninja API
     path("api/v1/auth/", include(jwt_urlpatterns)),  # DRF JWT views
     # path("api/v1/accounts/", include("accounts.urls")),  # Accounts API including Google auth
@@ -1,3 +1,7 @@
+import threading
+import time
+from collections import OrderedDict
+
 from rest_framework_simplejwt.tokens import AccessToken
 
 
@@ -7,3 +11,43 @@ def get_jwt_token(user):
     """
     token = AccessToken.for_user(user)
     return str(token)
+
+
+class LRUTTLCache:
+    """
+    Small thread-safe in-process LRU cache whose entries also expire after `ttl` seconds.
+    Meant to sit in front of Redis for very hot keys; every worker process has its own copy.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
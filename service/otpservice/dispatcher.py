@@ -0,0 +1,195 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from .sender import OtpSender
+
+logger = logging.getLogger(__name__)
+
+BUSY_MESSAGE = "OTP delivery is busy. Please try again shortly."
+
+
+def mask_recipient(to: str) -> str:
+    """Log-safe form of a phone number or email address: a***@example.com, ******3210."""
+    name, at, domain = to.partition("@")
+    if at:
+        return f"{name[:1]}***@{domain}"
+    return "*" * max(len(to) - 4, 0) + to[-4:]
+
+
+@dataclass
+class OutgoingOtp:
+    to: str
+    message: str
+    channel: str
+    attempts: int = 0
+
+
+class QueuedOtpDispatcher(OtpSender):
+    """
+    Asynchronous OTP delivery so request_otp doesn't wait on the provider.
+
+    Each channel has a bounded queue drained by its own pool of worker threads; the pool
+    size is the channel's concurrency limit. Workers collect up to `batch_size` messages
+    (waiting at most `batch_wait` seconds for a batch to fill) and hand them to the
+    channel's sender through send_many. Failed messages are retried with exponential
+    backoff up to `max_retries` times.
+    """
+
+    def __init__(self, senders: dict, concurrency: dict = None, queue_size: int = 10000,
+                 batch_size: int = 50, batch_wait: float = 0.05,
+                 max_retries: int = 3, retry_backoff: float = 0.5):
+        self.senders = senders
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "dropped": 0, "rejected": 0}
+
+        self._queues = {channel: queue.Queue(maxsize=queue_size) for channel in senders}
+        self._reserved = {channel: 0 for channel in senders}  # held by reserve(), not yet released
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._workers = []
+        for channel in senders:
+            for i in range((concurrency or {}).get(channel, 1)):
+                worker = threading.Thread(
+                    target=self._run, args=(channel,), name=f"otp-{channel}-{i}", daemon=True,
+                )
+                worker.start()
+                self._workers.append(worker)
+        atexit.register(self.shutdown)
+
+    @classmethod
+    def from_settings(cls, senders: dict, cfg: dict) -> "QueuedOtpDispatcher":
+        return cls(
+            senders,
+            concurrency=cfg["CONCURRENCY"],
+            queue_size=cfg["QUEUE_SIZE"],
+            batch_size=cfg["BATCH_SIZE"],
+            batch_wait=cfg["BATCH_WAIT_SECONDS"],
+            max_retries=cfg["MAX_RETRIES"],
+            retry_backoff=cfg["RETRY_BACKOFF_SECONDS"],
+        )
+
+    # ---- OtpSender API ----
+    def send(self, to: str, message: str) -> None:
+        self.submit(to, message)
+
+    def submit(self, to: str, message: str, channel: str = "sms") -> None:
+        self._check_channel(channel)
+        try:
+            self._queues[channel].put_nowait(OutgoingOtp(to, message, channel))
+        except queue.Full:
+            self._count("rejected")
+            raise ValueError(BUSY_MESSAGE)
+        self._count("queued")
+
+    @contextmanager
+    def reserve(self, channel: str = "sms"):
+        # A reservation counts against the queue until it is released, so the submit() made
+        # under it finds room. Only retries, which are dropped when the queue is full, bypass it.
+        self._check_channel(channel)
+        q = self._queues[channel]
+        with self._lock:
+            if q.qsize() + self._reserved[channel] >= q.maxsize:
+                self.stats["rejected"] += 1
+                raise ValueError(BUSY_MESSAGE)
+            self._reserved[channel] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._reserved[channel] -= 1
+
+    def pending(self) -> int:
+        return sum(q.unfinished_tasks for q in self._queues.values())
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until everything queued so far is delivered or dropped. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self.join(timeout)
+        self._stopping.set()
+
+    def _check_channel(self, channel: str) -> None:
+        if channel not in self._queues:
+            raise ValueError(f"Unsupported OTP channel: {channel}")
+
+    # ---- workers ----
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def _next_batch(self, channel: str) -> list:
+        q = self._queues[channel]
+        try:
+            batch = [q.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, channel: str) -> None:
+        sender = self.senders[channel]
+        q = self._queues[channel]
+        while not self._stopping.is_set():
+            batch = self._next_batch(channel)
+            if not batch:
+                continue
+            try:
+                failed = set(sender.send_many([(item.to, item.message) for item in batch]))
+            except Exception:
+                failed = {(item.to, item.message) for item in batch}
+
+            for item in batch:
+                if (item.to, item.message) in failed:
+                    self._retry(item)
+                else:
+                    self._count("sent")
+                q.task_done()
+
+    def _retry(self, item: OutgoingOtp) -> None:
+        item.attempts += 1
+        if item.attempts > self.max_retries:
+            self._count("dropped")
+            logger.warning(
+                "giving up on %s to=%s after %s retries", item.channel, mask_recipient(item.to), self.max_retries,
+            )
+            return
+
+        self._count("retried")
+        q = self._queues[item.channel]
+        # Counted as pending until it is back in the queue
+        with q.all_tasks_done:
+            q.unfinished_tasks += 1
+
+        def requeue():
+            try:
+                q.put_nowait(item)
+            except queue.Full:
+                self._count("dropped")
+            finally:
+                q.task_done()
+
+        timer = threading.Timer(self.retry_backoff * (2 ** (item.attempts - 1)), requeue)
+        timer.daemon = True
+        timer.start()
@@ -0,0 +1,94 @@
+import uuid
+
+from django_redis import get_redis_connection
+
+from manipalapp.async_redis import get_async_redis
+
+
+DAILY_WINDOW_SECONDS = 60 * 60 * 24
+
+# Checks the resend cooldown and a sliding 24h window, then records the request, all in one
+# atomic server-side call. Time comes from the Redis server so app clocks don't matter.
+# KEYS[1] cooldown key, KEYS[2] window sorted set
+# ARGV[1] cooldown seconds, ARGV[2] window seconds, ARGV[3] limit, ARGV[4] unique member suffix
+# Returns 0 when allowed, 1 when in cooldown, 2 when the window is full.
+OTP_LIMIT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 1
+end
+
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local window_ms = tonumber(ARGV[2]) * 1000
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now_ms - window_ms)
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    return 2
+end
+
+redis.call('ZADD', KEYS[2], now_ms, now_ms .. ':' .. ARGV[4])
+redis.call('PEXPIRE', KEYS[2], window_ms)
+if tonumber(ARGV[1]) > 0 then
+    redis.call('SET', KEYS[1], 1, 'EX', ARGV[1])
+end
+return 0
+"""
+
+ALLOWED = 0
+IN_COOLDOWN = 1
+LIMIT_REACHED = 2
+
+
+class OtpRateLimiter:
+    """
+    Resend cooldown plus DAILY_REQUEST_LIMIT over a sliding 24h window, enforced by a single
+    Lua script so concurrent requests for one identifier can't overshoot the limit.
+    """
+
+    def __init__(self, cfg: dict, alias: str = "default"):
+        self.cfg = cfg
+        self.alias = alias
+        self._script = None
+
+    def _cooldown_key(self, identifier: str) -> str:
+        return f"otp:cooldown:{identifier}"
+
+    def _window_key(self, identifier: str) -> str:
+        return f"otp:window:{identifier}"
+
+    def _get_script(self):
+        # Registered lazily: EVALSHA, falling back to EVAL once per connection pool
+        if self._script is None:
+            self._script = get_redis_connection(self.alias).register_script(OTP_LIMIT_SCRIPT)
+        return self._script
+
+    def _script_args(self, identifier: str) -> dict:
+        return {
+            "keys": [self._cooldown_key(identifier), self._window_key(identifier)],
+            "args": [
+                self.cfg["RESEND_COOLDOWN"],
+                DAILY_WINDOW_SECONDS,
+                self.cfg["DAILY_REQUEST_LIMIT"],
+                uuid.uuid4().hex,
+            ],
+        }
+
+    def check(self, identifier: str) -> int:
+        return int(self._get_script()(**self._script_args(identifier)))
+
+    async def acheck(self, identifier: str) -> int:
+        # Script objects are bound to their client, and async clients to their event loop
+        script = get_async_redis(self.alias).register_script(OTP_LIMIT_SCRIPT)
+        return int(await script(**self._script_args(identifier)))
+
+    def hit(self, identifier: str) -> None:
+        self._raise_for(self.check(identifier))
+
+    async def ahit(self, identifier: str) -> None:
+        self._raise_for(await self.acheck(identifier))
+
+    def _raise_for(self, result: int) -> None:
+        if result == IN_COOLDOWN:
+            raise ValueError("Please wait before requesting another OTP.")
+        if result == LIMIT_REACHED:
+            raise ValueError("Daily OTP request limit reached. Try again tomorrow.")
@@ -1,4 +1,7 @@
+import threading
+import time
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
 
 
 class OtpSender(ABC):
@@ -6,8 +9,65 @@ class OtpSender(ABC):
     def send(self, to: str, message: str) -> None:
         pass
 
+    def send_many(self, messages: list) -> list:
+        """
+        Send a batch of (to, message) pairs and return the pairs that failed.
+        Providers with a bulk API should override this; the default sends one by one.
+        """
+        failed = []
+        for to, message in messages:
+            try:
+                self.send(to, message)
+            except Exception:
+                failed.append((to, message))
+        return failed
+
+    def submit(self, to: str, message: str, channel: str = "sms") -> None:
+        """Hand a message over for delivery. Plain senders deliver inline; dispatchers queue it."""
+        self.send(to, message)
+
+    def reserve(self, channel: str = "sms"):
+        """
+        Context manager holding room for one submit() on `channel`, or raising ValueError
+        when there is none. Plain senders always have room.
+        """
+        return nullcontext()
+
 class ConsoleSender(OtpSender):
     """Dev sender: prints to console/log; replace with manipal service later."""
     def send(self, to: str, message: str) -> None:
         print(f"[DEV-OTP] to={to} msg={message}")
 
+
+class FakeLatencySender(OtpSender):
+    """
+    Local stand-in for an SMS/email gateway: sleeps `latency` seconds per call (one call per
+    batch for send_many) and fails every `fail_every`-th call, so delivery throughput can be
+    measured without the network. Safe to share between dispatcher worker threads.
+    """
+    def __init__(self, latency: float = 0.1, fail_every: int = 0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+        self.delivered = 0
+        self._lock = threading.Lock()
+
+    def _call(self, count: int) -> None:
+        with self._lock:
+            self.calls += 1
+            fail = self.fail_every and self.calls % self.fail_every == 0
+        time.sleep(self.latency)
+        if fail:
+            raise ConnectionError("fake provider failure")
+        with self._lock:
+            self.delivered += count
+
+    def send(self, to: str, message: str) -> None:
+        self._call(1)
+
+    def send_many(self, messages: list) -> list:
+        try:
+            self._call(len(messages))
+        except ConnectionError:
+            return list(messages)
+        return []
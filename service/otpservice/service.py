@@ -1,146 +1,149 @@
 from datetime import timedelta
 
-from django.core.cache import cache
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 from django.conf import settings
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.db import transaction
 
 from .sender import OtpSender
-from accounts.utils import gen_otp, gen_salt, hash_code, constant_time_eq
+from .ratelimit import OtpRateLimiter
+from .store import ChallengeStore, build_challenge_store
+from accounts.utils import gen_otp, gen_salt, hash_code
 from manipalapp.settings import OTP_LOGIN_SETTINGS
 from accounts.models import User, UserProfile
-from accounts.models import OtpVerification
+from accounts.tokens import issue_tokens
 
 
 class OtpService:
-    def __init__(self,sender:OtpSender):
+    def __init__(self,sender:OtpSender,store:ChallengeStore=None):
         self.sender=sender
         self.cfg=OTP_LOGIN_SETTINGS
+        self.store=store or build_challenge_store(self.cfg)
+        self.rate_limiter=OtpRateLimiter(self.cfg)
 
     # ---- Rate limiting helpers ----
-    def _cooldown_key(self, identifier: str) -> str:
-        return f"otp:cooldown:{identifier}"
+    def _check_and_increment_limits(self, identifier: str):
+        # Cooldown + sliding 24h cap, checked and recorded atomically in one round trip
+        self.rate_limiter.hit(identifier)
 
 
-    def _daily_key(self, identifier: str) -> str:
-        today = timezone.now().date().isoformat()
-        return f"otp:daily:{identifier}:{today}"
+    # ---- Public API ----
+    def request_otp(self, identifier: str, channel: str = "sms") -> None:
+        # Room in the delivery queue first: a busy queue must neither spend a rate limit slot
+        # nor replace a challenge the user can still enter
+        with self.sender.reserve(channel):
+            self._check_and_increment_limits(identifier)
 
+            code, challenge = self._new_challenge(identifier, channel)
+            # Replaces any previous unused challenge for same identifier
+            self.store.create(**challenge)
 
-    def _check_and_increment_limits(self, identifier: str):
-        # Cooldown
-        if cache.get(self._cooldown_key(identifier)):
-            raise ValueError("Please wait before requesting another OTP.")
+            # Inline for plain senders, queued when the sender is a QueuedOtpDispatcher
+            self.sender.submit(identifier, self._message(code), channel)
 
-        # Daily cap
-        daily_key = self._daily_key(identifier)
-        count = cache.get(daily_key, 0)
-        if count >= self.cfg["DAILY_REQUEST_LIMIT"]:
-            raise ValueError("Daily OTP request limit reached. Try again tomorrow.")
+    async def arequest_otp(self, identifier: str, channel: str = "sms") -> None:
+        """request_otp for async views: rate limit over redis.asyncio, challenge through the async ORM."""
+        # Non-blocking, like request_otp it goes first
+        with self.sender.reserve(channel):
+            await self.rate_limiter.ahit(identifier)
 
-        cache.set(daily_key, count + 1, 60 * 60 * 24)
-        cache.set(self._cooldown_key(identifier), 1, self.cfg["RESEND_COOLDOWN"])  # cooldown seconds
+            code, challenge = self._new_challenge(identifier, channel)
+            await self.store.acreate(**challenge)
 
+            # An inline sender may block on its provider, keep it off the event loop
+            await sync_to_async(self.sender.submit, thread_sensitive=False)(identifier, self._message(code), channel)
 
-    # ---- Public API ----
-    def request_otp(self, identifier: str, channel: str = "sms") -> None:
-        self._check_and_increment_limits(identifier)
-
+    def _new_challenge(self, identifier: str, channel: str):
         # code = gen_otp(self.cfg["OTP_LENGTH"])
         code = "1234"
         salt = gen_salt()
-        code_h = hash_code(code, salt)
-        expires = timezone.now() + timedelta(seconds=self.cfg["TTL_SECONDS"])
-
-        # Invalidate previous unused challenges for same identifier
-        OtpVerification.objects.filter(identifier=identifier, is_used=False).update(is_used=True)
-
-        OtpVerification.objects.create(
-            identifier=identifier,
-            code_hash=code_h,
-            salt=salt,
-            channel=channel,
-            expires_at=expires,
-            max_attempts=self.cfg["MAX_ATTEMPTS"],
-        )
-
-        msg = f"Your {settings.OTP_LOGIN_SETTINGS.get('JWT_ISSUER','app')} login OTP is {code}. " \
+        return code, {
+            "identifier": identifier,
+            "code_hash": hash_code(code, salt),
+            "salt": salt,
+            "channel": channel,
+            "expires_at": timezone.now() + timedelta(seconds=self.cfg["TTL_SECONDS"]),
+            "max_attempts": self.cfg["MAX_ATTEMPTS"],
+        }
+
+    def _message(self, code: str) -> str:
+        return f"Your {settings.OTP_LOGIN_SETTINGS.get('JWT_ISSUER','app')} login OTP is {code}. " \
             f"It expires in {self.cfg['TTL_SECONDS']//60} minutes. Do not share this code."
-        self.sender.send(identifier, msg)
 
 
     def verify_otp(self, identifier: str, code: str, is_email_verification: bool = False) -> dict:
-        # Fetch the latest active challenge
-        try:
-            ch = (OtpVerification.objects
-                .filter(identifier=identifier, is_used=False)
-                .latest("created_at"))
-        except OtpVerification.DoesNotExist:
-            raise ValueError("No active OTP. Please request a new one.")
-
-        if ch.is_expired():
-            ch.is_used = True
-            ch.save(update_fields=["is_used"])
-            raise ValueError("OTP expired. Request a new one.")
-
-        if ch.attempts >= ch.max_attempts:
-            ch.is_used = True
-            ch.save(update_fields=["is_used"])
-            raise ValueError("Too many attempts. Request a new OTP.")
-        
-        ch.attempts += 1
-        ch.save(update_fields=["attempts"])
-
-        if not constant_time_eq(ch.code_hash, hash_code(code, ch.salt)):
-            remaining = max(0, ch.max_attempts - ch.attempts)
-            raise ValueError(f"Invalid OTP. {remaining} attempts left.")
-
-        # Success: mark used
-        ch.is_used = True
-        ch.save(update_fields=["is_used"])
+        # Attempt bookkeeping and the user lookup commit together. Errors are raised only
+        # after the transaction closes so a failed attempt is still recorded.
+        with transaction.atomic():
+            ch, error = self.store.attempt(identifier, code)
+            if error is None:
+                if is_email_verification:
+                    error = self._mark_email_verified(identifier)
+                else:
+                    user, profile = self._get_or_create_phone_user(identifier)
+
+        if error:
+            raise ValueError(error)
 
         if is_email_verification:
-            # This is email verification flow
-            try:
-                user = User.objects.get(email=identifier)
-                user.is_email_verified = True
-                user.save(update_fields=["is_email_verified"])
-                return {"success": True, "message": "Email verified successfully"}
-            except User.DoesNotExist:
-                raise ValueError("User not found")
-        else:
-            # This is phone login flow
-            user, created = User.objects.get_or_create(phone_number=identifier)
-            
-            # Check if profile is complete
-            profile, _ = UserProfile.objects.get_or_create(
-                user=user,
-                defaults={
-                    "first_name": "",
-                    "last_name": "",
-                    "gender": "other",
-                    "date_of_birth": "2000-01-01"  # placeholder
-                }
-            )
+            return {"success": True, "message": "Email verified successfully"}
 
-            if not profile.is_complete():
-                return {
-                    "user_exists": True,
-                    "profile_complete": False,
-                    "verification_id": str(ch.id),  # Send verification ID for profile completion
-                    "message": "Please complete your profile"
-                }
-            
-            # Profile is complete, return tokens
+        # profile.user is already cached, is_complete() doesn't query
+        if not profile.is_complete():
             return {
                 "user_exists": True,
-                "profile_complete": True,
-                "tokens": self._issue_token(user),
-                "is_email_verified": user.is_email_verified
+                "profile_complete": False,
+                "verification_id": str(ch.id),  # Send verification ID for profile completion
+                "message": "Please complete your profile"
             }
 
+        # Profile is complete, return tokens
+        return {
+            "user_exists": True,
+            "profile_complete": True,
+            "tokens": self._issue_token(user),
+            "is_email_verified": user.is_email_verified
+        }
+
+    async def averify_otp(self, identifier: str, code: str, is_email_verification: bool = False) -> dict:
+        # The attempt and the user lookup must commit together and Django has no async
+        # transactions, so the whole unit runs in the request's sync thread
+        return await sync_to_async(self.verify_otp)(identifier, code, is_email_verification)
+
+    def _mark_email_verified(self, identifier: str):
+        # This is email verification flow, returns an error message when the user is unknown
+        try:
+            user = User.objects.get(email=identifier)
+        except User.DoesNotExist:
+            return "User not found"
+        user.is_email_verified = True
+        user.save(update_fields=["is_email_verified"])
+        return None
+
+    def _get_or_create_phone_user(self, identifier: str):
+        # This is phone login flow: user and profile in one query, created on first login
+        user = (User.objects
+            .select_related("profile")
+            .filter(phone_number=identifier)
+            .first())
+        if user is None:
+            user = User.objects.create(phone_number=identifier)
+            profile = None
+        else:
+            profile = getattr(user, "profile", None)
+
+        if profile is None:
+            profile = UserProfile.objects.create(
+                user=user,
+                first_name="",
+                last_name="",
+                gender="other",
+                date_of_birth="2000-01-01"  # placeholder
+            )
+        return user, profile
+
 
     def complete_profile(self, verification_id: str, profile_data: dict) -> dict:
         """
@@ -159,8 +162,11 @@ class OtpService:
         Returns:
             dict: JWT tokens if successful
         """
+        verification = self.store.get(verification_id)
+        if verification is None:
+            raise ValueError("Invalid verification ID")
+
         try:
-            verification = OtpVerification.objects.get(id=verification_id)
             if verification.is_expired():
                 raise ValueError("Verification expired. Please request new OTP.")
                 
@@ -182,8 +188,6 @@ class OtpService:
             # Return tokens for automatic login
             return self._issue_token(user)
             
-        except OtpVerification.DoesNotExist:
-            raise ValueError("Invalid verification ID")
         except Exception as e:
             raise ValueError(f"Profile creation failed: {str(e)}")
 
@@ -204,11 +208,7 @@ class OtpService:
         return user,_
 
     def _issue_token(self, user):
-        refresh = RefreshToken.for_user(user)
-        return {
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-        }
+        return issue_tokens(user)
 
 
 
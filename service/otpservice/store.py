@@ -0,0 +1,457 @@
+import atexit
+import logging
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_tz
+from typing import Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from accounts.models import OtpVerification
+from accounts.utils import hash_code, constant_time_eq
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Challenge:
+    id: str
+    identifier: str
+    code_hash: str
+    salt: str
+    channel: str
+    expires_at: datetime
+    attempts: int
+    max_attempts: int
+    is_used: bool = False
+
+    def is_expired(self):
+        return timezone.now() >= self.expires_at
+
+
+class ChallengeStore(ABC):
+    """Where OtpService keeps its OTP challenges."""
+
+    @abstractmethod
+    def create(self, identifier: str, code_hash: str, salt: str, channel: str,
+               expires_at: datetime, max_attempts: int) -> Challenge:
+        """Store a new challenge and invalidate older unused ones for the identifier."""
+
+    async def acreate(self, identifier: str, code_hash: str, salt: str, channel: str,
+                      expires_at: datetime, max_attempts: int) -> Challenge:
+        """create() for async callers. Stores with native async I/O override it."""
+        return await sync_to_async(self.create)(identifier, code_hash, salt, channel, expires_at, max_attempts)
+
+    @abstractmethod
+    def get_active(self, identifier: str) -> Optional[Challenge]:
+        """Latest unused challenge for the identifier."""
+
+    @abstractmethod
+    def get(self, challenge_id: str) -> Optional[Challenge]:
+        pass
+
+    @abstractmethod
+    def increment_attempts(self, challenge: Challenge) -> int:
+        """Count one attempt and return the new total."""
+
+    @abstractmethod
+    def mark_used(self, challenge: Challenge) -> None:
+        pass
+
+    def attempt(self, identifier: str, code: str) -> Tuple[Optional[Challenge], Optional[str]]:
+        """
+        Check `code` against the active challenge, consuming it on success.
+        Returns (challenge, None) on success and (challenge or None, error message) otherwise.
+        Errors are returned rather than raised so callers can keep the bookkeeping inside a transaction.
+        """
+        ch = self.get_active(identifier)
+        if ch is None:
+            return None, "No active OTP. Please request a new one."
+
+        if ch.is_expired():
+            self.mark_used(ch)
+            return ch, "OTP expired. Request a new one."
+
+        if ch.attempts >= ch.max_attempts:
+            self.mark_used(ch)
+            return ch, "Too many attempts. Request a new OTP."
+
+        attempts = self.increment_attempts(ch)
+        # Another request may have used the last attempt in the meantime
+        if attempts > ch.max_attempts:
+            self.mark_used(ch)
+            return ch, "Too many attempts. Request a new OTP."
+
+        if not constant_time_eq(ch.code_hash, hash_code(code, ch.salt)):
+            remaining = max(0, ch.max_attempts - attempts)
+            return ch, f"Invalid OTP. {remaining} attempts left."
+
+        # Success: mark used
+        self.mark_used(ch)
+        return ch, None
+
+
+class OrmChallengeStore(ChallengeStore):
+    """Challenges as OtpVerification rows."""
+
+    def _to_challenge(self, row: OtpVerification) -> Challenge:
+        return Challenge(
+            id=str(row.id),
+            identifier=row.identifier,
+            code_hash=row.code_hash,
+            salt=row.salt,
+            channel=row.channel,
+            expires_at=row.expires_at,
+            attempts=row.attempts,
+            max_attempts=row.max_attempts,
+            is_used=row.is_used,
+        )
+
+    def create(self, identifier, code_hash, salt, channel, expires_at, max_attempts):
+        # Invalidate previous unused challenges for same identifier
+        OtpVerification.objects.filter(identifier=identifier, is_used=False).update(is_used=True)
+
+        row = OtpVerification.objects.create(
+            identifier=identifier,
+            code_hash=code_hash,
+            salt=salt,
+            channel=channel,
+            expires_at=expires_at,
+            max_attempts=max_attempts,
+        )
+        return self._to_challenge(row)
+
+    async def acreate(self, identifier, code_hash, salt, channel, expires_at, max_attempts):
+        await OtpVerification.objects.filter(identifier=identifier, is_used=False).aupdate(is_used=True)
+
+        row = await OtpVerification.objects.acreate(
+            identifier=identifier,
+            code_hash=code_hash,
+            salt=salt,
+            channel=channel,
+            expires_at=expires_at,
+            max_attempts=max_attempts,
+        )
+        return self._to_challenge(row)
+
+    def get_active(self, identifier):
+        try:
+            row = (OtpVerification.objects
+                .filter(identifier=identifier, is_used=False)
+                .latest("created_at"))
+        except OtpVerification.DoesNotExist:
+            return None
+        return self._to_challenge(row)
+
+    def get(self, challenge_id):
+        try:
+            return self._to_challenge(OtpVerification.objects.get(id=challenge_id))
+        except (OtpVerification.DoesNotExist, ValidationError):
+            return None
+
+    def increment_attempts(self, challenge):
+        OtpVerification.objects.filter(id=challenge.id).update(attempts=F("attempts") + 1)
+        challenge.attempts += 1
+        return challenge.attempts
+
+    def mark_used(self, challenge):
+        OtpVerification.objects.filter(id=challenge.id).update(is_used=True)
+        challenge.is_used = True
+
+    def attempt(self, identifier, code):
+        # The row stays locked until the caller's transaction ends, so concurrent guesses for
+        # one identifier are serialised and each outcome costs exactly one UPDATE.
+        # Nothing raises inside the block, so joining an outer transaction needs no savepoint.
+        with transaction.atomic(savepoint=False):
+            row = (OtpVerification.objects
+                .select_for_update()
+                .filter(identifier=identifier, is_used=False)
+                .order_by("-created_at")
+                .first())
+            if row is None:
+                return None, "No active OTP. Please request a new one."
+
+            ch = self._to_challenge(row)
+            rows = OtpVerification.objects.filter(id=row.id)
+
+            if ch.is_expired():
+                rows.update(is_used=True)
+                ch.is_used = True
+                return ch, "OTP expired. Request a new one."
+
+            if ch.attempts >= ch.max_attempts:
+                rows.update(is_used=True)
+                ch.is_used = True
+                return ch, "Too many attempts. Request a new OTP."
+
+            # Attempt count and, on a match, the used flag go out in the same statement
+            matched = constant_time_eq(ch.code_hash, hash_code(code, ch.salt))
+            rows.update(attempts=F("attempts") + 1, is_used=matched)
+            ch.attempts += 1
+            ch.is_used = matched
+
+        if not matched:
+            remaining = max(0, ch.max_attempts - ch.attempts)
+            return ch, f"Invalid OTP. {remaining} attempts left."
+        return ch, None
+
+
+class OtpAuditWriter:
+    """
+    Write-behind audit trail for challenges that live outside the database.
+    New challenges are inserted and final states updated in batches, from a background
+    thread, every `flush_seconds` or as soon as `batch_size` entries are pending.
+    """
+
+    def __init__(self, batch_size: int = 200, flush_seconds: float = 2.0):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._created = []
+        self._finished = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record_created(self, challenge: Challenge) -> None:
+        with self._lock:
+            self._created.append(OtpVerification(
+                id=challenge.id,
+                identifier=challenge.identifier,
+                code_hash=challenge.code_hash,
+                salt=challenge.salt,
+                channel=challenge.channel,
+                expires_at=challenge.expires_at,
+                max_attempts=challenge.max_attempts,
+            ))
+            pending = len(self._created) + len(self._finished)
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def record_used(self, challenge: Challenge) -> None:
+        with self._lock:
+            self._finished[challenge.id] = OtpVerification(
+                id=challenge.id, attempts=challenge.attempts, is_used=True,
+            )
+
+    def flush(self) -> None:
+        with self._lock:
+            created, self._created = self._created, []
+            finished, self._finished = list(self._finished.values()), {}
+        if not created and not finished:
+            return
+        try:
+            # Inserts go first so updates for challenges created in the same batch find their row
+            OtpVerification.objects.bulk_create(created, batch_size=self.batch_size, ignore_conflicts=True)
+            OtpVerification.objects.bulk_update(finished, ["attempts", "is_used"], batch_size=self.batch_size)
+        finally:
+            close_old_connections()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="otp-audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Audit is best effort, never take the OTP flow down with it
+                logger.exception("OTP audit flush failed")
+
+
+# Checks, counts and consumes one attempt atomically, so two right codes can't both log in.
+# KEYS[1] challenge hash, ARGV[1] the submitted code hashed with the challenge's salt.
+# Returns {status, attempts}, status being one of the ATTEMPT_* values below. Nothing is
+# written to a key that no longer exists, which would leave a hash without TTL behind.
+ATTEMPT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {1, 0}
+end
+local f = redis.call('HMGET', KEYS[1], 'is_used', 'attempts', 'max_attempts', 'expires_at', 'code_hash')
+local attempts = tonumber(f[2])
+if f[1] == '1' then
+    return {1, attempts}
+end
+
+local now = redis.call('TIME')
+if tonumber(now[1]) + tonumber(now[2]) / 1000000 >= tonumber(f[4]) then
+    redis.call('HSET', KEYS[1], 'is_used', 1)
+    return {2, attempts}
+end
+if attempts >= tonumber(f[3]) then
+    redis.call('HSET', KEYS[1], 'is_used', 1)
+    return {3, attempts}
+end
+
+attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if f[5] == ARGV[1] then
+    redis.call('HSET', KEYS[1], 'is_used', 1)
+    return {0, attempts}
+end
+return {4, attempts}
+"""
+
+# HSET only while the challenge still exists
+MARK_USED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], 'is_used', 1)
+end
+"""
+
+ATTEMPT_OK, ATTEMPT_MISSING, ATTEMPT_EXPIRED, ATTEMPT_EXHAUSTED, ATTEMPT_MISMATCH = range(5)
+
+
+class RedisChallengeStore(ChallengeStore):
+    """
+    Challenges as one Redis hash each, expiring natively after the OTP lifetime.
+    otp:active:<identifier> points at the current challenge. OtpVerification is kept
+    as an audit log through OtpAuditWriter.
+    """
+
+    def __init__(self, ttl_seconds: int, audit: Optional[OtpAuditWriter] = None, alias: str = "default"):
+        self.ttl_seconds = ttl_seconds
+        self.audit = audit
+        self.alias = alias
+        self._scripts = {}
+
+    @property
+    def redis(self):
+        return get_redis_connection(self.alias)
+
+    def _challenge_key(self, challenge_id: str) -> str:
+        return f"otp:challenge:{challenge_id}"
+
+    def _active_key(self, identifier: str) -> str:
+        return f"otp:active:{identifier}"
+
+    def _to_challenge(self, challenge_id: str, data: dict) -> Optional[Challenge]:
+        if not data:
+            return None
+        data = {k.decode(): v.decode() for k, v in data.items()}
+        return Challenge(
+            id=challenge_id,
+            identifier=data["identifier"],
+            code_hash=data["code_hash"],
+            salt=data["salt"],
+            channel=data["channel"],
+            expires_at=datetime.fromtimestamp(float(data["expires_at"]), tz=dt_tz.utc),
+            attempts=int(data["attempts"]),
+            max_attempts=int(data["max_attempts"]),
+            is_used=data["is_used"] == "1",
+        )
+
+    def create(self, identifier, code_hash, salt, channel, expires_at, max_attempts):
+        challenge = Challenge(
+            id=str(uuid.uuid4()),
+            identifier=identifier,
+            code_hash=code_hash,
+            salt=salt,
+            channel=channel,
+            expires_at=expires_at,
+            attempts=0,
+            max_attempts=max_attempts,
+        )
+        key = self._challenge_key(challenge.id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(key, mapping={
+            "identifier": identifier,
+            "code_hash": code_hash,
+            "salt": salt,
+            "channel": channel,
+            "expires_at": expires_at.timestamp(),
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "is_used": 0,
+        })
+        pipe.expire(key, self.ttl_seconds)
+        # Re-pointing the identifier is what invalidates the previous challenge
+        pipe.set(self._active_key(identifier), challenge.id, ex=self.ttl_seconds)
+        pipe.execute()
+
+        if self.audit is not None:
+            self.audit.record_created(challenge)
+        return challenge
+
+    def get_active(self, identifier):
+        challenge_id = self.redis.get(self._active_key(identifier))
+        if challenge_id is None:
+            return None
+        challenge = self.get(challenge_id.decode())
+        if challenge is None or challenge.is_used:
+            return None
+        return challenge
+
+    def get(self, challenge_id):
+        return self._to_challenge(challenge_id, self.redis.hgetall(self._challenge_key(challenge_id)))
+
+    def increment_attempts(self, challenge):
+        challenge.attempts = self.redis.hincrby(self._challenge_key(challenge.id), "attempts", 1)
+        return challenge.attempts
+
+    def mark_used(self, challenge):
+        self._script(MARK_USED_SCRIPT)(keys=[self._challenge_key(challenge.id)])
+        challenge.is_used = True
+        if self.audit is not None:
+            self.audit.record_used(challenge)
+
+    def attempt(self, identifier, code):
+        ch = self.get_active(identifier)
+        if ch is None:
+            return None, "No active OTP. Please request a new one."
+
+        # The code is hashed here, everything that must not race happens in ATTEMPT_SCRIPT
+        status, attempts = self._consume(ch, hash_code(code, ch.salt))
+        ch.attempts = int(attempts)
+        if status == ATTEMPT_MISSING:
+            # Expired or consumed by a concurrent request since get_active
+            return None, "No active OTP. Please request a new one."
+        if status != ATTEMPT_MISMATCH:
+            ch.is_used = True
+            if self.audit is not None:
+                self.audit.record_used(ch)
+        if status == ATTEMPT_EXPIRED:
+            return ch, "OTP expired. Request a new one."
+        if status == ATTEMPT_EXHAUSTED:
+            return ch, "Too many attempts. Request a new OTP."
+        if status == ATTEMPT_MISMATCH:
+            remaining = max(0, ch.max_attempts - ch.attempts)
+            return ch, f"Invalid OTP. {remaining} attempts left."
+        return ch, None
+
+    def _consume(self, challenge, code_hash):
+        return self._script(ATTEMPT_SCRIPT)(keys=[self._challenge_key(challenge.id)], args=[code_hash])
+
+    def _script(self, source):
+        # Registered lazily like OtpRateLimiter's: EVALSHA, falling back to EVAL once
+        if source not in self._scripts:
+            self._scripts[source] = self.redis.register_script(source)
+        return self._scripts[source]
+
+
+def build_challenge_store(cfg: dict) -> ChallengeStore:
+    """Store selected by OTP_LOGIN_SETTINGS["CHALLENGE_STORE"] ("orm" or "redis")."""
+    backend = cfg.get("CHALLENGE_STORE", "orm")
+    if backend == "orm":
+        return OrmChallengeStore()
+    if backend == "redis":
+        audit = OtpAuditWriter(
+            batch_size=cfg.get("AUDIT_BATCH_SIZE", 200),
+            flush_seconds=cfg.get("AUDIT_FLUSH_SECONDS", 2),
+        )
+        return RedisChallengeStore(ttl_seconds=cfg["TTL_SECONDS"], audit=audit)
+    raise ValueError(f"Unknown OTP challenge store: {backend}")
@@ -0,0 +1,47 @@
+from django.conf import settings
+
+from accounts.models import PointAction, User
+from manipalapp.counters import CounterBuffer
+from .service import PointsService
+
+
+class BufferedPoints:
+    """
+    Point awards for high-frequency events (likes, reads, logins). award() is a single
+    HINCRBY in Redis; flush_counters periodically turns the per user and action totals
+    into one ledger row each and one balance UPDATE per user through PointsService.
+    Ledger rows carry the batch id and each applied batch is recorded once in
+    AppliedPointBatch, which makes replaying a batch after a crash a no-op.
+    """
+
+    def __init__(self, service: PointsService = None, alias: str = "default"):
+        self.service = service or PointsService()
+        self.buffer = CounterBuffer(
+            "points", self._apply,
+            lock_seconds=settings.COUNTER_BUFFER_SETTINGS["LOCK_SECONDS"],
+            alias=alias,
+        )
+
+    def award(self, user_id: int, action_id: int) -> None:
+        self.buffer.incr(f"{user_id}:{action_id}")
+
+    def flush(self) -> int:
+        return self.buffer.flush()
+
+    def _apply(self, batch_id: str, counts: dict) -> None:
+        parsed = {tuple(map(int, field.split(":"))): times for field, times in counts.items()}
+        actions = PointAction.objects.in_bulk({action_id for _, action_id in parsed})
+        # Users archived since the event was counted would fail the ledger's foreign key
+        # and block the batch for good
+        users = set(User._base_manager.filter(id__in={user_id for user_id, _ in parsed}).values_list("id", flat=True))
+        self.service.award_counts(
+            {
+                (user_id, actions[action_id]): times
+                for (user_id, action_id), times in parsed.items()
+                if user_id in users and action_id in actions
+            },
+            batch=batch_id,
+        )
+
+
+buffered_points = BufferedPoints()
@@ -0,0 +1,139 @@
+import uuid
+from typing import Optional
+
+from django_redis import get_redis_connection
+
+from accounts.models import UserPoints
+
+
+class Leaderboard:
+    """
+    UserPoints mirrored into Redis sorted sets: lb:global for everyone and lb:type:<id> per
+    ProfileType, member = user id, score = points. Rank lookups are O(log n) instead of an
+    ORDER BY / COUNT(*) over the points table. lb:types remembers which type board each user
+    is on so a profile type change can move them.
+
+    PointsService feeds score changes after commit, accounts.signals handles profile type
+    changes and deletions. rebuild() recomputes everything from the database.
+    """
+
+    global_key = "lb:global"
+    types_key = "lb:types"
+
+    def __init__(self, alias: str = "default"):
+        self.alias = alias
+
+    @property
+    def redis(self):
+        return get_redis_connection(self.alias)
+
+    def board_key(self, profile_type_id: Optional[int] = None) -> str:
+        return self.global_key if profile_type_id is None else f"lb:type:{profile_type_id}"
+
+    # ---- Writes ----
+    def record(self, changes: dict) -> None:
+        """Apply {user_id: (points delta, profile_type_id or None)}."""
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id, (delta, profile_type_id) in changes.items():
+            pipe.zincrby(self.global_key, delta, user_id)
+            if profile_type_id is not None:
+                pipe.zincrby(self.board_key(profile_type_id), delta, user_id)
+                pipe.hset(self.types_key, user_id, profile_type_id)
+        pipe.execute()
+
+    def move(self, user_id: int, profile_type_id: Optional[int]) -> None:
+        """Put the user on the board of their (new) profile type."""
+        old = self.redis.hget(self.types_key, user_id)
+        old = int(old) if old is not None else None
+        if old == profile_type_id:
+            return
+        score = self.redis.zscore(self.global_key, user_id)
+        pipe = self.redis.pipeline(transaction=True)
+        if old is not None:
+            pipe.zrem(self.board_key(old), user_id)
+        if profile_type_id is None:
+            pipe.hdel(self.types_key, user_id)
+        else:
+            pipe.hset(self.types_key, user_id, profile_type_id)
+            if score is not None:
+                pipe.zadd(self.board_key(profile_type_id), {user_id: score})
+        pipe.execute()
+
+    def remove(self, user_id: int) -> None:
+        old = self.redis.hget(self.types_key, user_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zrem(self.global_key, user_id)
+        if old is not None:
+            pipe.zrem(self.board_key(int(old)), user_id)
+            pipe.hdel(self.types_key, user_id)
+        pipe.execute()
+
+    # ---- Reads ----
+    def top(self, limit: int, profile_type_id: Optional[int] = None) -> list:
+        """[(rank, user_id, points)] for the best `limit` users, rank starting at 1."""
+        rows = self.redis.zrevrange(self.board_key(profile_type_id), 0, limit - 1, withscores=True)
+        return [(rank, int(member), int(score)) for rank, (member, score) in enumerate(rows, start=1)]
+
+    def around(self, user_id: int, radius: int, profile_type_id: Optional[int] = None) -> list:
+        """The user and up to `radius` neighbours on each side; empty if they are not ranked."""
+        key = self.board_key(profile_type_id)
+        position = self.redis.zrevrank(key, user_id)
+        if position is None:
+            return []
+        start = max(0, position - radius)
+        rows = self.redis.zrevrange(key, start, position + radius, withscores=True)
+        return [(rank, int(member), int(score)) for rank, (member, score) in enumerate(rows, start=start + 1)]
+
+    # ---- Rebuild ----
+    def rebuild(self, batch_size: int = 5000) -> int:
+        """
+        Recompute every board from UserPoints into scratch keys and swap them in with RENAME,
+        so readers never see a half-built board. Score changes recorded while the rebuild runs
+        may be overwritten; the next rebuild corrects them. Returns the number of users ranked.
+        """
+        redis = self.redis
+        suffix = f":rebuild:{uuid.uuid4().hex}"
+        type_ids = set()
+        ranked = 0
+
+        last_user_id = 0
+        while True:
+            rows = list(UserPoints.objects
+                        .filter(user_id__gt=last_user_id, user__is_deleted=False)
+                        .order_by("user_id")
+                        .values_list("user_id", "points", "user__profile__profile_type_id")[:batch_size])
+            if not rows:
+                break
+            pipe = redis.pipeline(transaction=False)
+            pipe.zadd(self.global_key + suffix, {user_id: points for user_id, points, _ in rows})
+            by_type = {}
+            for user_id, points, profile_type_id in rows:
+                if profile_type_id is not None:
+                    by_type.setdefault(profile_type_id, {})[user_id] = points
+            for profile_type_id, members in by_type.items():
+                pipe.zadd(self.board_key(profile_type_id) + suffix, members)
+                pipe.hset(self.types_key + suffix, mapping={user_id: profile_type_id for user_id in members})
+            pipe.execute()
+            type_ids.update(by_type)
+            ranked += len(rows)
+            last_user_id = rows[-1][0]
+
+        built = {self.board_key(t) for t in type_ids}
+        if ranked:
+            built.add(self.global_key)
+        if type_ids:
+            built.add(self.types_key)
+        # Boards of types that no longer have anyone on them, plus anything left empty
+        stale = {key.decode() for key in redis.scan_iter(match="lb:type:*") if b":rebuild:" not in key}
+        stale = (stale | {self.global_key, self.types_key}) - built
+
+        pipe = redis.pipeline(transaction=True)
+        for key in built:
+            pipe.rename(key + suffix, key)
+        if stale:
+            pipe.delete(*stale)
+        pipe.execute()
+        return ranked
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,123 @@
+from collections import defaultdict
+from typing import Iterable, Tuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import AppliedPointBatch, PointAction, PointLedger, UserPoints, UserProfile
+from .leaderboard import Leaderboard, leaderboard as default_leaderboard
+
+
+class PointsService:
+    """
+    Awards PointActions. Every award appends a PointLedger row and moves the user's
+    UserPoints balance with an F() expression in the same transaction, so concurrent
+    awards never overwrite each other and the ledger always sums to the balance.
+    Committed changes are then mirrored to the Redis leaderboard.
+    """
+
+    def __init__(self, batch_size: int = 1000, leaderboard: Leaderboard = None):
+        self.batch_size = batch_size
+        self.leaderboard = leaderboard or default_leaderboard
+
+    def award(self, user_id: int, action: PointAction) -> int:
+        """Award `action` to one user and return the new balance."""
+        with transaction.atomic():
+            PointLedger.objects.create(user_id=user_id, action=action, points=action.points)
+            self._add(user_id, action.points)
+            points, profile_type_id = (UserPoints.objects
+                .values_list("points", "user__profile__profile_type_id")
+                .get(user_id=user_id))
+            self._publish({user_id: (action.points, profile_type_id)})
+            return points
+
+    def bulk_award(self, awards: Iterable[Tuple[int, PointAction]]) -> int:
+        """
+        Award many (user_id, action) pairs at once: one bulk insert into the ledger and one
+        UPDATE for all balances, each user moved once by the total of their awards.
+        Returns the number of ledger rows written.
+        """
+        entries = [PointLedger(user_id=user_id, action=action, points=action.points) for user_id, action in awards]
+        return self._apply(entries)
+
+    def award_counts(self, counts: dict, batch: str) -> int:
+        """
+        Apply pre-aggregated awards {(user_id, action): times} as one ledger row per pair,
+        tagged with `batch`. A batch that was already applied is skipped, so a flush of the
+        counter buffer can safely be replayed. Returns the number of ledger rows written.
+        """
+        entries = [
+            PointLedger(user_id=user_id, action=action, points=action.points * times, batch=batch)
+            for (user_id, action), times in counts.items()
+        ]
+        with transaction.atomic():
+            # Claimed first: a concurrent flush of the same batch waits on the unique key and
+            # fails once this transaction commits, instead of both applying it
+            try:
+                with transaction.atomic():
+                    AppliedPointBatch.objects.create(batch=batch)
+            except IntegrityError:
+                return 0
+            return self._apply(entries)
+
+    def _apply(self, entries: list) -> int:
+        if not entries:
+            return 0
+        totals = defaultdict(int)
+        for entry in entries:
+            totals[entry.user_id] += entry.points
+
+        with transaction.atomic():
+            PointLedger.objects.bulk_create(entries, batch_size=self.batch_size)
+            self._ensure_balances(totals)
+            # Lock in user_id order so concurrent batches over the same users cannot deadlock
+            list(UserPoints.objects.select_for_update()
+                 .filter(user_id__in=totals).order_by("user_id").values_list("id", flat=True))
+            if connection.vendor == "postgresql":
+                self._add_many(totals)
+            else:
+                for user_id, delta in sorted(totals.items()):
+                    self._add(user_id, delta)
+            types = dict(UserProfile.objects.filter(user_id__in=totals).values_list("user_id", "profile_type_id"))
+            self._publish({user_id: (delta, types.get(user_id)) for user_id, delta in totals.items()})
+        return len(entries)
+
+    def _publish(self, changes: dict) -> None:
+        # Only once the balances are committed. robust: a Redis failure is logged instead of
+        # failing an award that already happened; rebuild_leaderboard catches the board up.
+        transaction.on_commit(lambda: self.leaderboard.record(changes), robust=True)
+
+    def _ensure_balances(self, user_ids) -> None:
+        # A user's first award needs a row to increment; losing the race to another insert is fine.
+        # Inserted in user_id order like the locks below: two batches inserting the same new
+        # users in different orders would wait on each other's unique keys and deadlock
+        UserPoints.objects.bulk_create(
+            [UserPoints(user_id=user_id, points=0) for user_id in sorted(user_ids)],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+
+    def _add(self, user_id: int, delta: int) -> None:
+        updated = (UserPoints.objects.filter(user_id=user_id)
+                   .update(points=F("points") + delta, updated_at=timezone.now()))
+        if not updated:
+            self._ensure_balances([user_id])
+            UserPoints.objects.filter(user_id=user_id).update(points=F("points") + delta, updated_at=timezone.now())
+
+    def _add_many(self, totals: dict) -> None:
+        table = connection.ops.quote_name(UserPoints._meta.db_table)
+        rows = sorted(totals.items())
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            values = ", ".join(["(%s, %s)"] * len(chunk))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    UPDATE {table} AS p
+                    SET points = p.points + v.delta, updated_at = now()
+                    FROM (VALUES {values}) AS v (user_id, delta)
+                    WHERE p.user_id = v.user_id
+                    """,
+                    [value for row in chunk for value in row],
+                )